@@ -237,6 +237,8 @@ class EquationKiller:
                 problem.condition.simplified_equation.pop(remove_eq)
             for add_eq, premise in add_lists:  # remove useless equation
                 problem.condition.simplified_equation[add_eq] = premise
+            if len(remove_lists) > 0 or len(add_lists) > 0:
+                problem.condition.eq_version += 1
 
     @staticmethod
     @func_set_timeout(2)
@@ -465,9 +467,9 @@ class EquationKiller:
         if target_expr is None:
             return None, []
 
-        if target_expr in problem.condition.get_items_by_predicate("Equation"):  # no need to solve
+        if ("Equation", str(target_expr)) in problem.condition.id_of_item:  # no need to solve
             return 0, [problem.condition.get_id_by_predicate_and_item("Equation", target_expr)]
-        if -target_expr in problem.condition.get_items_by_predicate("Equation"):
+        if ("Equation", str(-target_expr)) in problem.condition.id_of_item:
             return 0, [problem.condition.get_id_by_predicate_and_item("Equation", -target_expr)]
 
         try:
@@ -608,10 +610,11 @@ class GeometryPredicateLogicExecutor:
     def run_logic(gpl, problem, letters=None):
         """
         Run 'products', 'logic_constraints' of GPL.
+        Items are joined and filtered on columnar tables of point codes, see <Condition.get_table>.
         :param gpl: <dict>, (products, logic_constraints, algebra_constraints, conclusions), geometric predicate logic.
         :param problem: instance of class <Problem>.
         :param letters: preset letters for para selection.
-        :return r: triplet, (r_ids, r_items, r_vars).
+        :return r: triplet, (r_ids, r_items, r_vars), items are coded by point codes.
         """
         products = gpl["products"]
         logic_constraints = gpl["logic_constraints"]
@@ -619,57 +622,65 @@ class GeometryPredicateLogicExecutor:
         if not products or len(products[0]) < 2:
             return [], [], []
 
-        r_ids, r_items = problem.condition.get_ids_and_items_by_predicate_and_variable(products[0][0], products[0][1])
-        r_vars = products[0][1]
-        for i in range(len(r_items)):  # delete duplicated vars and corresponding item
-            r_items[i] = list(r_items[i])
-        r_vars = list(r_vars)
-        deleted_vars_index = []  # deleted vars index
-        for i in range(len(r_vars)):
-            if r_vars[i] in r_vars[0:i]:
-                deleted_vars_index.append(i)
-        for index in deleted_vars_index[::-1]:  # delete
-            r_vars.pop(index)
-            for i in range(len(r_items)):
-                r_items[i].pop(index)
+        coded_letters = {}  # preset letters coded by point codes
+        if letters is not None:
+            for v in letters:
+                coded_letters[v] = problem.condition.encode((letters[v],))[0]
+
+        table = problem.condition.get_table(products[0][0], len(products[0][1]))
+        r_vars = []  # delete duplicated vars and corresponding column
+        positions = []
+        for i in range(len(products[0][1])):
+            if products[0][1][i] not in r_vars:
+                r_vars.append(products[0][1][i])
+                positions.append(i)
+        r_ids = [(_id,) for _id in table.ids]
+        r_items = list(zip(*[table.columns[p] for p in positions]))
+        r_ids, r_items = GeometryPredicateLogicExecutor.select(r_ids, r_items, r_vars, coded_letters)
 
         for i in range(1, len(products)):
             r_ids, r_items, r_vars = GeometryPredicateLogicExecutor.product(
                 (r_ids, r_items, r_vars), products[i], problem)
-
-        if letters is not None:  # select result according to letters
-            for i in range(len(r_ids))[::-1]:
-                selected = True
-                for v in letters:
-                    if r_items[i][r_vars.index(v)] != letters[v]:
-                        selected = False
-                        break
-                if not selected:
-                    r_items.pop(i)
-                    r_ids.pop(i)
+            r_ids, r_items = GeometryPredicateLogicExecutor.select(r_ids, r_items, r_vars, coded_letters)
 
         for i in range(len(logic_constraints)):
             r_ids, r_items, r_vars = GeometryPredicateLogicExecutor.constraint_logic(
                 (r_ids, r_items, r_vars), logic_constraints[i], problem)
 
-        if letters is not None:  # select result according to letters
-            for i in range(len(r_ids))[::-1]:
-                selected = True
-                for v in letters:
-                    if r_items[i][r_vars.index(v)] != letters[v]:
-                        selected = False
-                        break
-                if not selected:
-                    r_items.pop(i)
-                    r_ids.pop(i)
+        return r_ids, r_items, list(r_vars)
 
-        return r_ids, r_items, r_vars
+    @staticmethod
+    def select(r_ids, r_items, r_vars, coded_letters):
+        """
+        Select result according to coded letters. Called by <GeometryPredicateLogicExecutor.run_logic>.
+        :param r_ids: <list> of <tuple>, premise ids.
+        :param r_items: <list> of <tuple>, items coded by point codes.
+        :param r_vars: vars of items.
+        :param coded_letters: <dict>, {var: point_code}, only vars in r_vars are selected.
+        :return r_ids, r_items: selected result.
+        """
+        selected_vars = [(r_vars.index(v), coded_letters[v]) for v in coded_letters if v in r_vars]
+        if len(selected_vars) == 0:
+            return r_ids, r_items
+
+        selected_ids = []
+        selected_items = []
+        for i in range(len(r_items)):
+            selected = True
+            for j, code in selected_vars:
+                if r_items[i][j] != code:
+                    selected = False
+                    break
+            if selected:
+                selected_ids.append(r_ids[i])
+                selected_items.append(r_items[i])
+        return selected_ids, selected_items
 
     @staticmethod
     def run_algebra(r, gpl, problem):
         """
         Run 'algebra_constraints' of GPL.
-        :param r: triplet, (r_ids, r_items, r_vars).
+        :param r: triplet, (r_ids, r_items, r_vars), items are coded by point codes.
         :param gpl: <dict>, (products, logic_constraints, algebra_constraints, conclusions), geometric predicate logic.
         :param problem: instance of class <Problem>.
         :return results: <list> of <tuple>, [(letters, premises, conclusions)].
@@ -689,7 +700,8 @@ class GeometryPredicateLogicExecutor:
     def make_conclusion(r, gpl, problem):
         """
         Make conclusion according given reasoned points sets 'r' and GDL 'conclusions'.
-        :param r: triplet, (r_ids, r_items, r_vars).
+        Items are decoded to points here, the only place that results of GPL leave point codes.
+        :param r: triplet, (r_ids, r_items, r_vars), items are coded by point codes.
         :param gpl: <dict>, (products, logic_constraints, algebra_constraints, conclusions), geometric predicate logic.
         :param problem: instance of class <Problem>.
         :return results: <list> of <tuple>, [(letters, premises, conclusions)].
@@ -699,10 +711,11 @@ class GeometryPredicateLogicExecutor:
         conclusions = gpl["conclusions"]
         results = []
         r_ids, r_items, r_vars = r
+        point_of_code = problem.condition.point_of_code
         for i in range(len(r_ids)):
             letters = {}
             for j in range(len(r_vars)):
-                letters[r_vars[j]] = r_items[i][j]
+                letters[r_vars[j]] = point_of_code[r_items[i][j]]
             conclusion = []
 
             for predicate, item in conclusions:
@@ -719,29 +732,33 @@ class GeometryPredicateLogicExecutor:
     @staticmethod
     def product(r1, r2_logic, problem):
         """
-        Constrained Cartesian product.
-        :param r1: triplet, (r1_ids, r1_items, r1_vars).
+        Constrained Cartesian product, implemented as hash join on the columnar table of r2.
+        :param r1: triplet, (r1_ids, r1_items, r1_vars), items are coded by point codes.
         :param r2_logic: geo predicate logic, such as ['Collinear', ['a', 'b', 'c']].
         :param problem: instance of class <Problem>.
         :return r: triplet, (r_ids, r_items, r_vars), reasoning result.
-        >> product(([(1,), (2,)], [('A', 'B'), ('C', 'D')], ['a', 'b']),
+        >> product(([(1,), (2,)], [(0, 1), (2, 3)], ['a', 'b']),
                    ['Line', ['b', 'c']],
                    problem)
-        ([(1, 3), (2, 4)], [('A', 'B', 'C'), ('C', 'D', 'E')], ['a', 'b', 'c'])
+        ([(1, 3), (2, 4)], [(0, 1, 2), (2, 3, 4)], ['a', 'b', 'c'])
         """
         r1_ids, r1_items, r1_vars = r1
         if len(r1_ids) == 0:
             return [], [], r1_vars
-        r2_ids, r2_items = problem.condition.get_ids_and_items_by_predicate_and_variable(r2_logic[0], r2_logic[1])
+        table = problem.condition.get_table(r2_logic[0], len(r2_logic[1]))
         r2_vars = r2_logic[1]
 
         inter = list(set(r1_vars) & set(r2_vars))  # intersection
         for i in range(len(inter)):
             inter[i] = (r1_vars.index(inter[i]), r2_vars.index(inter[i]))  # change to index
+        inter.sort(key=lambda x: x[1])
+        r1_positions = [r1_i for r1_i, _ in inter]
+        r2_positions = tuple(r2_i for _, r2_i in inter)
 
         difference = list(set(r2_vars) - set(r1_vars))  # difference
         for i in range(len(difference)):
             difference[i] = r2_vars.index(difference[i])  # change to index
+        difference_columns = [table.columns[dif] for dif in difference]
 
         r_ids = []  # result
         r_items = []
@@ -750,41 +767,42 @@ class GeometryPredicateLogicExecutor:
             r_vars.append(r2_vars[dif])
         r_vars = tuple(r_vars)
 
+        if len(r2_positions) == 0:  # no same vars, Cartesian product
+            index = None
+            all_rows = range(len(table))
+        else:
+            index = table.get_index(r2_positions)
+            all_rows = None
+
         for i in range(len(r1_items)):
             r1_data = r1_items[i]
-            for j in range(len(r2_items)):
-                r2_data = r2_items[j]
-                passed = True
-                for r1_i, r2_i in inter:
-                    if r1_data[r1_i] != r2_data[r2_i]:  # the corresponding points are inconsistent.
-                        passed = False
-                        break
-                if passed:
-                    item = list(r1_data)
-                    for dif in difference:
-                        item.append(r2_data[dif])
-                    r_items.append(tuple(item))
-                    r_ids.append(tuple(set(list(r1_ids[i]) + list(r2_ids[j]))))
+            if index is None:
+                rows = all_rows
+            else:
+                rows = index.get(tuple(r1_data[r1_i] for r1_i in r1_positions), ())
+            for j in rows:
+                r_items.append(r1_data + tuple(column[j] for column in difference_columns))
+                r_ids.append(tuple(set(list(r1_ids[i]) + [table.ids[j]])))
         return r_ids, r_items, r_vars
 
     @staticmethod
     def constraint_logic(r1, r2_logic, problem):
         """
-        Logic constraint.
-        :param r1: triplet, (r1_ids, r1_items, r1_vars).
+        Logic constraint, implemented as hash lookup on the columnar table of r2.
+        :param r1: triplet, (r1_ids, r1_items, r1_vars), items are coded by point codes.
         :param r2_logic: geo predicate logic, such as ['Collinear', ['a', 'b', 'c']].
         :param problem: instance of class <Problem>.
         :return r: triplet, (r_ids, r_items, r_vars), reasoning result.
         >> problem.conditions['Line'].get_item_by_id  # supposed
         {3: ('B', 'C')}
-        >> constraint_logic(([(1,), (2,)], [('A', 'B', 'C'), ('C', 'D', 'E')], ['a', 'b', 'c']),
+        >> constraint_logic(([(1,), (2,)], [(0, 1, 2), (2, 3, 4)], ['a', 'b', 'c']),
                             ['Line', ['b', 'c']],
                             problem)
-        ([(1, 3)], [('A', 'B', 'C')], ['a', 'b', 'c'])
-        >> constraint_logic(([(1,), (2,)], [('A', 'B', 'C'), ('C', 'D', 'E')], ['a', 'b', 'c']),
+        ([(1, 3)], [(0, 1, 2)], ['a', 'b', 'c'])
+        >> constraint_logic(([(1,), (2,)], [(0, 1, 2), (2, 3, 4)], ['a', 'b', 'c']),
                             ['~Line', ['b', 'c']],
                             problem)
-        ([(2,)], [('C', 'D', 'E')], ['a', 'b', 'c'])
+        ([(2,)], [(2, 3, 4)], ['a', 'b', 'c'])
         """
         r1_ids, r1_items, r1_vars = r1
         if len(r1_ids) == 0:
@@ -796,20 +814,22 @@ class GeometryPredicateLogicExecutor:
             r2_logic = tuple(r2_logic)
             oppose = True
         index = [r1_vars.index(v) for v in r2_logic[1]]
+        table = problem.condition.get_table(r2_logic[0], len(r2_logic[1]))
+        table_index = table.get_index(tuple(range(len(r2_logic[1]))))
         r_ids = []
         r_items = []
 
         if not oppose:  # &
             for i in range(len(r1_items)):
                 r2_item = tuple(r1_items[i][j] for j in index)
-                if r2_item in problem.condition.get_items_by_predicate(r2_logic[0]):
-                    r2_id = problem.condition.get_id_by_predicate_and_item(r2_logic[0], r2_item)
+                if r2_item in table_index:
+                    r2_id = table.ids[table_index[r2_item][0]]
                     r_ids.append(tuple(set(list(r1_ids[i]) + [r2_id])))
                     r_items.append(r1_items[i])
         else:  # &~
             for i in range(len(r1_items)):
                 r2_item = tuple(r1_items[i][j] for j in index)
-                if r2_item not in problem.condition.get_items_by_predicate(r2_logic[0]):
+                if r2_item not in table_index:
                     r_ids.append(r1_ids[i])
                     r_items.append(r1_items[i])
         return r_ids, r_items, r1_vars
@@ -817,8 +837,8 @@ class GeometryPredicateLogicExecutor:
     @staticmethod
     def constraint_algebra(r1, r2_algebra, problem):
         """
-        Algebra constraint.
-        :param r1: triplet, (r1_ids, r1_items, r1_vars).
+        Algebra constraint, equations are built with points decoded from the codes of r1.
+        :param r1: triplet, (r1_ids, r1_items, r1_vars), items are coded by point codes.
         :param r2_algebra: geo predicate logic, such as ['Equal', [['Length', ['a', 'b']], 5]].
         :param problem: instance of class <Problem>.
         :return r: triplet, (r_ids, r_items, r_vars), reasoning result.
@@ -826,14 +846,14 @@ class GeometryPredicateLogicExecutor:
         {ll_ab: 1}
         >> problem.conditions['Equation'].get_item_by_id  # supposed
         {3: ll_ab - 1}
-        >> constraint_algebra(([(1,), (2,)], [('A', 'B', 'C'), ('C', 'D', 'E')], ['a', 'b', 'c']),
+        >> constraint_algebra(([(1,), (2,)], [(0, 1, 2), (2, 3, 4)], ['a', 'b', 'c']),
                               ['Equal', [['Length', ['a', 'b']], 1]],
                               problem)
-        ([(1, 3)], [('A', 'B', 'C')], ['a', 'b', 'c'])
-        >> constraint_algebra(([(1,), (2,)], [('A', 'B', 'C'), ('C', 'D', 'E')], ['a', 'b', 'c']),
+        ([(1, 3)], [(0, 1, 2)], ['a', 'b', 'c'])
+        >> constraint_algebra(([(1,), (2,)], [(0, 1, 2), (2, 3, 4)], ['a', 'b', 'c']),
                               ['~Equal', [['Length', ['a', 'b']], 1]],
                               problem)
-        ([(2,)], [('C', 'D', 'E')], ['a', 'b', 'c'])
+        ([(2,)], [(2, 3, 4)], ['a', 'b', 'c'])
         """
         r1_ids, r1_items, r1_vars = r1
         if len(r1_ids) == 0:
@@ -846,12 +866,13 @@ class GeometryPredicateLogicExecutor:
             oppose = True
         r_ids = []
         r_items = []
+        point_of_code = problem.condition.point_of_code
 
         if not oppose:  # &
             for i in range(len(r1_items)):
                 letters = {}
                 for j in range(len(r1_vars)):
-                    letters[r1_vars[j]] = r1_items[i][j]
+                    letters[r1_vars[j]] = point_of_code[r1_items[i][j]]
                 eq = get_equation_from_tree(problem, r2_algebra[1], True, letters)
                 try:
                     result, premise = EquationKiller.solve_target(eq, problem)
@@ -868,7 +889,7 @@ class GeometryPredicateLogicExecutor:
             for i in range(len(r1_items)):
                 letters = {}
                 for j in range(len(r1_vars)):
-                    letters[r1_vars[j]] = r1_items[i][j]
+                    letters[r1_vars[j]] = point_of_code[r1_items[i][j]]
                 eq = get_equation_from_tree(problem, r2_algebra[1], True, letters)
                 try:
                     result, premise = EquationKiller.solve_target(eq, problem)
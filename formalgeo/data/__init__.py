@@ -5,9 +5,9 @@
 """Download and Management of Datasets and Formal Systems."""
 
 __all__ = [
-    "show_available_datasets", "download_dataset", "remove_dataset",
+    "show_available_datasets", "download_dataset", "remove_dataset", "pack_dataset",
     "DatasetLoader"
 ]
 
-from formalgeo.data.data import show_available_datasets, download_dataset, remove_dataset
+from formalgeo.data.data import show_available_datasets, download_dataset, remove_dataset, pack_dataset
 from formalgeo.data.data import DatasetLoader
@@ -1,11 +1,15 @@
 from formalgeo.tools import load_json, save_json, get_user_input
+from formalgeo.parse import parse_problem_cdl, cache_parsed_problem_cdl
+import formalgeo
 import os
+import pickle
 import requests
 from tqdm import tqdm
 import json
 import tarfile
 import shutil
 import random
+from collections import OrderedDict
 
 
 def get_remote_datasets():
@@ -142,7 +146,56 @@ def remove_dataset(dataset_name, datasets_path):
         os.remove(f"{datasets_path}/{dataset_name}.json")
 
 
+def _get_problems_mtime(problems_path):
+    """Latest mtime of problems/ and the files in it, changed by adding, removing or editing problem files."""
+    mtime = os.path.getmtime(problems_path)
+    with os.scandir(problems_path) as entries:
+        for entry in entries:
+            mtime = max(mtime, entry.stat().st_mtime)
+    return mtime
+
+
+def pack_dataset(dataset_name, datasets_path, parse=True):
+    """
+    Pack problems/<pid>.json of dataset into one JSONL file 'problems.jsonl', line i is problem i+1, and save
+    byte offsets of lines to 'problems_index.json'. <DatasetLoader> reads packed problems when they are
+    consistent with problems/, so run it again after problems are changed.
+    :param parse: <bool>, also save parsed problem_CDL to 'problems_parsed.pkl', loaded by <DatasetLoader> into
+    the cache of <formalgeo.parse.parse_problem_cdl> when formalgeo version is unchanged.
+    """
+    dataset_path = f"{datasets_path}/{dataset_name}"
+    problem_number = load_json(f"{dataset_path}/info.json")["problem_number"]
+    offsets = [0]
+    parsed_offsets = [0]
+    with open(f"{dataset_path}/problems.jsonl.tmp", "w", encoding="utf-8", newline="\n") as f, \
+            open(f"{dataset_path}/problems_parsed.pkl.tmp", "wb") as f_parsed:
+        for pid in tqdm(range(1, problem_number + 1)):
+            problem_CDL = load_json(f"{dataset_path}/problems/{pid}.json")
+            line = json.dumps(problem_CDL, ensure_ascii=False) + "\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line.encode("utf-8")))
+            if parse:
+                try:
+                    parsed_CDL = parse_problem_cdl(problem_CDL)
+                except Exception:  # malformed problem, parsed when searched and raise there
+                    parsed_CDL = None
+                record = pickle.dumps(parsed_CDL, protocol=pickle.HIGHEST_PROTOCOL)
+                f_parsed.write(record)
+                parsed_offsets.append(parsed_offsets[-1] + len(record))
+    os.replace(f"{dataset_path}/problems.jsonl.tmp", f"{dataset_path}/problems.jsonl")
+    if parse:
+        os.replace(f"{dataset_path}/problems_parsed.pkl.tmp", f"{dataset_path}/problems_parsed.pkl")
+    else:
+        os.remove(f"{dataset_path}/problems_parsed.pkl.tmp")
+    index = {"problem_number": problem_number, "mtime": _get_problems_mtime(f"{dataset_path}/problems"),
+             "offsets": offsets, "version": formalgeo.__version__,
+             "parsed_offsets": parsed_offsets if parse else None}
+    save_json(index, f"{dataset_path}/problems_index.json.tmp")
+    os.replace(f"{dataset_path}/problems_index.json.tmp", f"{dataset_path}/problems_index.json")
+
+
 class DatasetLoader:
+    cache_size = 1024  # <int>, count of parsed problems kept by <get_problem>
 
     def __init__(self, dataset_name, datasets_path):
         local_datasets = get_local_datasets(datasets_path)
@@ -159,6 +212,21 @@ class DatasetLoader:
         self.info = load_json(f"{self.dataset_path}/info.json")
         self.predicate_GDL = load_json(f"{self.dataset_path}/gdl/predicate_GDL.json")
         self.theorem_GDL = load_json(f"{self.dataset_path}/gdl/theorem_GDL.json")
+        self.gdl_cache_path = f"{self.dataset_path}/gdl_cache"  # parsed GDL cache, next to gdl/
+        self.snapshot_path = f"{self.dataset_path}/snapshots"  # initialized problem snapshots
+
+        self.problem_offsets = None  # byte offsets of problems in 'problems.jsonl', None when not packed
+        self.parsed_offsets = None  # byte offsets of parsed problems in 'problems_parsed.pkl', None when not packed
+        self.problem_cache = OrderedDict()  # {pid: problem_CDL}, LRU
+        if os.path.exists(f"{self.dataset_path}/problems_index.json"):
+            index = load_json(f"{self.dataset_path}/problems_index.json")
+            if index["problem_number"] == self.info["problem_number"] and \
+                    (not os.path.exists(f"{self.dataset_path}/problems") or
+                     _get_problems_mtime(f"{self.dataset_path}/problems") == index["mtime"]):
+                self.problem_offsets = index["offsets"]
+                if index.get("parsed_offsets") is not None and index.get("version") == formalgeo.__version__ and \
+                        os.path.exists(f"{self.dataset_path}/problems_parsed.pkl"):
+                    self.parsed_offsets = index["parsed_offsets"]
 
     def show(self):
         for item in self.info:
@@ -168,11 +236,31 @@ class DatasetLoader:
         print(f"files: {files}")
 
     def get_problem(self, pid):
-        if pid <= self.info["problem_number"]:
-            return load_json(f"{self.dataset_path}/problems/{pid}.json")
-        else:
+        """Return problem_CDL of pid. Returned problem_CDL is cached and shared, don't modify it."""
+        if pid in self.problem_cache:
+            self.problem_cache.move_to_end(pid)
+            return self.problem_cache[pid]
+
+        if pid > self.info["problem_number"]:
             msg = "No problem named {}.".format(pid)
             raise Exception(msg)
+        if self.problem_offsets is not None:  # packed dataset
+            with open(f"{self.dataset_path}/problems.jsonl", "rb") as f:
+                f.seek(self.problem_offsets[pid - 1])
+                problem_CDL = json.loads(f.read(self.problem_offsets[pid] - self.problem_offsets[pid - 1]))
+            if self.parsed_offsets is not None:  # parse_problem_cdl(problem_CDL) then returns it without parsing
+                with open(f"{self.dataset_path}/problems_parsed.pkl", "rb") as f:
+                    f.seek(self.parsed_offsets[pid - 1])
+                    parsed_CDL = pickle.loads(f.read(self.parsed_offsets[pid] - self.parsed_offsets[pid - 1]))
+                if parsed_CDL is not None:
+                    cache_parsed_problem_cdl(problem_CDL, parsed_CDL)
+        else:
+            problem_CDL = load_json(f"{self.dataset_path}/problems/{pid}.json")
+
+        self.problem_cache[pid] = problem_CDL
+        if len(self.problem_cache) > DatasetLoader.cache_size:
+            self.problem_cache.popitem(last=False)
+        return problem_CDL
 
     def get_problem_split(self, split_msg=None):
         file_path = f"{self.dataset_path}/files"
@@ -1,8 +1,42 @@
+from collections import OrderedDict
 from formalgeo.parse.basic import parse_geo_predicate, parse_equal_predicate, parse_equal_to_tree
 
+parsed_cdl_cache_size = 1024  # <int>, count of parsed problem_CDL kept by <parse_problem_cdl>
+_parsed_problem_cdl = OrderedDict()  # {problem_id: (source CDL, parsed_CDL)}, LRU, see <parse_problem_cdl>
+
 
 def parse_problem_cdl(problem_CDL):
-    """parse problem_CDL to logic form."""
+    """
+    Parse problem_CDL to logic form.
+    Results are cached by problem_id and returned again while the CDL of problem is unchanged, so different
+    strategies and replays on one problem parse it only once. Returned parsed_CDL is shared, don't modify it.
+    """
+    source = _get_source_cdl(problem_CDL)
+    cached = _parsed_problem_cdl.get(problem_CDL["problem_id"])
+    if cached is not None and cached[0] == source:
+        _parsed_problem_cdl.move_to_end(problem_CDL["problem_id"])
+        return cached[1]
+
+    parsed_CDL = _parse_problem_cdl(problem_CDL)
+    cache_parsed_problem_cdl(problem_CDL, parsed_CDL)
+    return parsed_CDL
+
+
+def cache_parsed_problem_cdl(problem_CDL, parsed_CDL):
+    """Add parsed_CDL of problem_CDL to the cache of <parse_problem_cdl>, such as parsed CDL loaded from disk."""
+    _parsed_problem_cdl[problem_CDL["problem_id"]] = (_get_source_cdl(problem_CDL), parsed_CDL)
+    _parsed_problem_cdl.move_to_end(problem_CDL["problem_id"])
+    if len(_parsed_problem_cdl) > parsed_cdl_cache_size:
+        _parsed_problem_cdl.popitem(last=False)
+
+
+def _get_source_cdl(problem_CDL):
+    """Fields of problem_CDL that parsed_CDL depends on."""
+    return (problem_CDL["construction_cdl"], problem_CDL["text_cdl"], problem_CDL["image_cdl"],
+            problem_CDL.get("goal_cdl"), problem_CDL.get("problem_answer"))
+
+
+def _parse_problem_cdl(problem_CDL):
     parsed_CDL = {
         "id": problem_CDL["problem_id"],
         "cdl": {
@@ -0,0 +1,77 @@
+import os
+import json
+import pickle
+import hashlib
+import warnings
+import formalgeo
+from formalgeo.parse.parse_pgdl import parse_predicate_gdl
+from formalgeo.parse.parse_tgdl import parse_theorem_gdl
+
+_parsed_gdl = None  # (predicate_GDL, theorem_GDL, parsed_predicate_GDL, parsed_theorem_GDL), see <parse_gdl>
+
+
+def parse_gdl(predicate_GDL, theorem_GDL, cache_path=None):
+    """
+    Parse predicate_GDL and theorem_GDL, return parsed_predicate_GDL and parsed_theorem_GDL.
+    The last result is kept and returned when called with the same GDL objects again. Parsed GDL is not
+    modified after parsing, so searchers in one process share it, and processes forked after parsing
+    inherit it without parsing again.
+    :param predicate_GDL: predicate GDL.
+    :param theorem_GDL: theorem GDL.
+    :param cache_path: <str>, path of parsed GDL cache files, such as 'datasets/formalgeo7k_v2/gdl_cache'.
+    Parsed GDL is pickled there, keyed by content hash of GDL and formalgeo version. Set None not to use it.
+    """
+    global _parsed_gdl
+    if _parsed_gdl is not None and _parsed_gdl[0] is predicate_GDL and _parsed_gdl[1] is theorem_GDL:
+        return _parsed_gdl[2], _parsed_gdl[3]
+
+    cache_filename = None
+    parsed = None
+    if cache_path is not None:
+        cache_filename = os.path.join(cache_path, "parsed_gdl_{}.pkl".format(
+            get_gdl_hash(predicate_GDL, theorem_GDL)))
+        parsed = load_parsed_gdl(cache_filename)
+
+    if parsed is None:
+        parsed_predicate_GDL = parse_predicate_gdl(predicate_GDL)
+        parsed_theorem_GDL = parse_theorem_gdl(theorem_GDL, parsed_predicate_GDL)
+        parsed = (parsed_predicate_GDL, parsed_theorem_GDL)
+        if cache_filename is not None:
+            save_parsed_gdl(parsed, cache_filename)
+
+    _parsed_gdl = (predicate_GDL, theorem_GDL, parsed[0], parsed[1])
+    return parsed
+
+
+def get_gdl_hash(predicate_GDL, theorem_GDL):
+    """Hash of GDL content and formalgeo version, parsed GDL cache is invalid when any of them changed."""
+    sha = hashlib.sha256(formalgeo.__version__.encode("utf-8"))
+    sha.update(json.dumps(predicate_GDL, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    sha.update(json.dumps(theorem_GDL, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return sha.hexdigest()[:32]
+
+
+def load_parsed_gdl(cache_filename):
+    """Return (parsed_predicate_GDL, parsed_theorem_GDL) in cache file, None when not cached or broken."""
+    if not os.path.exists(cache_filename):
+        return None
+    try:
+        with open(cache_filename, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def save_parsed_gdl(parsed, cache_filename):
+    """Save parsed GDL to cache file, written to a temp file first so that readers never see a partial one."""
+    tmp_filename = "{}.{}.tmp".format(cache_filename, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        with open(tmp_filename, "wb") as f:
+            pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, cache_filename)
+    except OSError as e:
+        w_msg = "Can't save parsed GDL cache to '{}': {}.".format(cache_filename, e)
+        warnings.warn(w_msg)
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
@@ -62,9 +62,29 @@ def parse_predicate_gdl(predicate_GDL):
                 "multi": tuple(parse_multi(attributions[item]["multi"]))
             }
 
+    parsed_GDL["Alias"] = parse_alias(parsed_GDL)
+
     return parsed_GDL
 
 
+def parse_alias(parsed_GDL):
+    """
+    Build predicate name resolution table, {alias: canonical predicate}.
+    Attribution has the highest priority, followed by Entity and Relation.
+    >> parse_alias({'Entity': {'Square': ...}, 'Relation': {}, 'Attribution': {'LengthOfLine': ...}})
+    {'LengthOfLine': 'LengthOfLine', 'Square': 'Square'}
+    """
+    alias = {}
+    for category in ["Attribution", "Entity", "Relation"]:
+        for predicate in parsed_GDL[category]:
+            if predicate not in alias:
+                alias[predicate] = predicate
+            base = predicate.split("(", 1)[0]
+            if base not in alias:
+                alias[base] = predicate
+    return alias
+
+
 def parse_ee_check(ee_check):
     """
     parse ee_check to logic form.
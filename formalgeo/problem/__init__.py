@@ -9,7 +9,7 @@ condition auto-expansion, and validity checks.
 """
 
 __all__ = [
-    "Problem"
+    "Problem", "init_problem", "get_snapshot_filename"
 ]
 
-from formalgeo.problem.problem import Problem
+from formalgeo.problem.problem import Problem, init_problem, get_snapshot_filename
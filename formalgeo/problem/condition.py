@@ -1,4 +1,5 @@
 import copy
+from array import array
 from formalgeo.parse import parse_expr, get_expr_from_tree, get_equation_from_tree
 
 
@@ -17,12 +18,18 @@ class Condition:
         self.ids_of_predicate = {}  # <dict>, {predicate: [id]}, such as {'Angle': [0, 1, 2]}
         self.ids_of_step = {}  # <dict>, {step: [id]}, such as {0: [0, 1, 2]}
 
-        self.sym_of_attr = {}  # <dict>, {(attr, paras): sym}, such as {('LengthOfLine', ('A', 'B')): l_ab}
+        self.sym_of_attr = {}  # <dict>, {(attr, coded paras): sym}, such as {('LengthOfLine', (0, 1)): l_ab}
         self.attr_of_sym = {}  # <dict>, {sym: (attr, (paras))}, such as {l_ab: ('LengthOfLine', (('A', 'B'),))}
         self.value_of_sym = {}  # <dict>, {sym: value}, such as {l_ab: 3}
         self.simplified_equation = {}  # <dict>, {simplified_equation: premises}, such as {a + b - 2: [1, 2, 3]}
+        self.eq_version = 0  # <int>, increased when simplified_equation changes
         self.eq_solved = True  # <bool>, record whether the equation is solved
 
+        self.code_of_point = {}  # <dict>, {point: code}, such as {'A': 0}
+        self.point_of_code = []  # <list> of <str>, [point], such as ['A']
+        self.tables = {}  # <dict>, {(predicate, arity): FactTable}, columnar items for GPL execution
+        self.tabled_count = {}  # <dict>, {predicate: count}, number of items synced to tables
+
     def init_by_fl(self, fix_length_predicates, variable_length_predicates, attribution_predicates=None):
         """
         Initial condition by formal language.
@@ -59,7 +66,10 @@ class Condition:
         self.attr_of_sym = copy.deepcopy(condition.attr_of_sym)
         self.value_of_sym = copy.deepcopy(condition.value_of_sym)
         self.simplified_equation = copy.deepcopy(condition.simplified_equation)
+        self.eq_version = condition.eq_version
         self.eq_solved = condition.eq_solved
+        self.code_of_point = copy.copy(condition.code_of_point)  # tables are rebuilt lazily
+        self.point_of_code = copy.copy(condition.point_of_code)
         
     def add(self, predicate, item, premise, theorem):
         """
@@ -80,6 +90,7 @@ class Condition:
 
             if predicate == "Equation" and theorem[0] != "solve_eq":
                 self.simplified_equation[item] = [self.id_count]
+                self.eq_version += 1
                 self.eq_solved = False
 
             if predicate == "Equation":
@@ -91,6 +102,49 @@ class Condition:
 
         return False, None
 
+    def add_batch(self, conditions):
+        """
+        Add a batch of conditions in one step and guarantee no redundancy.
+        Ids are assigned in list order starting from <self.id_count>, so when the given conditions are
+        unique, the premise of later conditions can refer to the ids of earlier ones.
+        :param conditions: <list> of (predicate, item, premise, theorem).
+        :return results: <list> of (added, _id), _id is None when not added.
+        """
+        results = []
+        staged = {}  # {(predicate, item): (predicate, item, premise, theorem)}, item of Equation is <str>
+        for predicate, item, premise, theorem in conditions:
+            if predicate == "Equation":
+                key = (predicate, str(item))
+                exist = key in staged or ("Equation", str(-item)) in staged
+            else:
+                key = (predicate, item)
+                exist = key in staged
+            if exist or self.has(predicate, item):
+                results.append((False, None))
+                continue
+            results.append((True, self.id_count + len(staged)))
+            staged[key] = (predicate, item, premise, theorem)
+
+        if len(staged) == 0:
+            return results
+
+        _id = self.id_count
+        for key in staged:
+            predicate, item, premise, theorem = staged[key]
+            self.items.append((predicate, item, tuple(sorted(list(set(premise)))), theorem, self.step_count))
+            self.items_group[predicate].append(item)
+            self.ids_of_predicate[predicate].append(_id)
+            self.id_of_item[key] = _id
+            if predicate == "Equation" and theorem[0] != "solve_eq":
+                self.simplified_equation[item] = [_id]
+                self.eq_version += 1
+                self.eq_solved = False
+            _id += 1
+        self.ids_of_step[self.step_count] += list(range(self.id_count, _id))
+        self.id_count = _id
+
+        return results
+
     def has(self, predicate, item):
         """
         Check if this condition exists.
@@ -99,9 +153,9 @@ class Condition:
         :return exist: <bool>, indicate whether the addition was successful.
         """
         if predicate == "Equation":
-            return item in self.items_group["Equation"] or -item in self.items_group["Equation"]
+            return ("Equation", str(item)) in self.id_of_item or ("Equation", str(-item)) in self.id_of_item
         else:
-            return item in self.items_group[predicate]
+            return (predicate, item) in self.id_of_item
 
     def step(self):
         self.step_count += 1
@@ -131,6 +185,55 @@ class Condition:
                 ids.append([self.id_of_item[(predicate, item)]])
         return ids, items
 
+    def encode(self, item):
+        """
+        Encode item with point codes, new points are interned.
+        >> encode(('A', 'B', 'C'))
+        (0, 1, 2)
+        """
+        coded_item = []
+        for point in item:
+            if point not in self.code_of_point:
+                self.code_of_point[point] = len(self.point_of_code)
+                self.point_of_code.append(point)
+            coded_item.append(self.code_of_point[point])
+        return tuple(coded_item)
+
+    def decode(self, coded_item):
+        """
+        Decode item from point codes.
+        >> decode((0, 1, 2))
+        ('A', 'B', 'C')
+        """
+        return tuple(self.point_of_code[code] for code in coded_item)
+
+    def clear_tables(self):
+        """Drop columnar tables and their indexes to free memory, they are rebuilt lazily by <get_table>."""
+        self.tables = {}
+        self.tabled_count = {}
+
+    def get_table(self, predicate, arity):
+        """
+        Return columnar table of predicate's items whose length is arity.
+        Tables are built lazily and synced incrementally with newly added items.
+        :param predicate: <str>, predicate of condition, except 'Equation'.
+        :param arity: <int>, length of item.
+        :return table: <FactTable>.
+        """
+        ids = self.ids_of_predicate[predicate]
+        count = self.tabled_count.get(predicate, 0)
+        if count < len(ids):
+            for _id in ids[count:]:
+                item = self.items[_id][1]
+                if (predicate, len(item)) not in self.tables:
+                    self.tables[(predicate, len(item))] = FactTable(len(item))
+                self.tables[(predicate, len(item))].append(_id, self.encode(item))
+            self.tabled_count[predicate] = len(ids)
+
+        if (predicate, arity) not in self.tables:
+            self.tables[(predicate, arity)] = FactTable(arity)
+        return self.tables[(predicate, arity)]
+
     def get_premise_by_predicate_and_item(self, predicate, item):
         return self.items[self.get_id_by_predicate_and_item(predicate, item)][2]
 
@@ -138,7 +241,42 @@ class Condition:
         return self.items[self.get_id_by_predicate_and_item(predicate, item)][3]
 
 
+class FactTable:
+    def __init__(self, arity):
+        """Columnar items of one predicate with the same arity, points are coded by <Condition.encode>."""
+        self.ids = array("l")  # <array>, id column
+        self.columns = tuple(array("l") for _ in range(arity))  # <tuple> of <array>, point code columns
+        self.indexes = {}  # <dict>, {positions: (indexed_count, {key: [row]})}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, _id, coded_item):
+        self.ids.append(_id)
+        for i in range(len(self.columns)):
+            self.columns[i].append(coded_item[i])
+
+    def get_index(self, positions):
+        """
+        Return hash index of columns in positions, updated incrementally.
+        :param positions: <tuple> of <int>, column positions.
+        :return index: <dict>, {key: [row]}, key is <tuple> of point codes in positions.
+        """
+        count, index = self.indexes.get(positions, (0, {}))
+        if count < len(self.ids):
+            columns = [self.columns[p][count:] for p in positions]
+            for row, key in enumerate(zip(*columns), count):
+                if key in index:
+                    index[key].append(row)
+                else:
+                    index[key] = [row]
+            self.indexes[positions] = (len(self.ids), index)
+        return index
+
+
 class Goal:
+    __slots__ = ("type", "item", "answer", "solved", "solved_answer", "premise", "theorem")
+
     def __init__(self):
         """Goal of one problem."""
         self.type = None  # <str>, such as: 'algebra', 'logic'.
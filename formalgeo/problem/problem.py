@@ -1,5 +1,7 @@
+import os
 import time
 import copy
+import pickle
 import warnings
 from itertools import combinations
 from sympy import symbols
@@ -10,6 +12,8 @@ from formalgeo.core import EquationKiller as EqKiller
 from itertools import combinations, permutations  # 导入全排列函数
 
 class Problem:
+    snapshot_version = 2  # <int>, format of <get_snapshot>, increase it whenever the saved state changes
+
     def __init__(self):
         """Problem conditions, goal, and solving message."""
         self.parsed_predicate_GDL = None
@@ -33,6 +37,7 @@ class Problem:
         self.condition.init_by_fl(fix_length_predicates, variable_length_predicates, attribution_predicates)
 
         self._construction_init()  # start construction
+        self.condition.encode(tuple(item[0] for item in self.condition.items_group["Point"]))  # intern points
 
         # conditions of text_and_image
         for predicate, item in self.parsed_problem_CDL["parsed_cdl"]["text_and_image_cdl"]:
@@ -59,6 +64,43 @@ class Problem:
         self.goal = Goal()  # set goal
         self.goal.init_by_copy(problem.goal)
 
+    def load_problem_by_snapshot(self, parsed_predicate_GDL, parsed_theorem_GDL, parsed_problem_CDL, snapshot):
+        """
+        Load problem through snapshot returned by <get_snapshot>, faster than construction and solving equations.
+        :param snapshot: <bytes>, snapshot of the problem with the same problem CDL.
+        """
+        self.parsed_predicate_GDL = parsed_predicate_GDL  # gdl
+        self.parsed_theorem_GDL = parsed_theorem_GDL  # gdl
+        self.parsed_problem_CDL = parsed_problem_CDL  # cdl
+        self.condition = Condition()
+        self.goal = Goal()
+        self.update_by_snapshot(snapshot)
+
+    def update_by_snapshot(self, snapshot):
+        """
+        Update conditions and goal to snapshot returned by <get_snapshot>, such as the snapshot of another copy
+        of this problem. Columnar tables are kept, they stay valid when conditions of snapshot extend current ones.
+        :param snapshot: <bytes>, snapshot of the problem with the same problem CDL.
+        """
+        cdl, condition_state, goal_state = pickle.loads(snapshot)
+        if cdl != self.parsed_problem_CDL["cdl"]:
+            e_msg = "Snapshot is not saved from problem {}.".format(self.parsed_problem_CDL["id"])
+            raise Exception(e_msg)
+        self.condition.__dict__.update(condition_state)
+        for attr, value in zip(Goal.__slots__, goal_state):
+            setattr(self.goal, attr, value)
+
+    def get_snapshot(self):
+        """
+        Return snapshot <bytes> of problem conditions, point codes, symbols, simplified equations and goal.
+        Columnar tables of conditions are rebuilt lazily and not saved.
+        """
+        condition_state = {attr: value for attr, value in self.condition.__dict__.items()
+                           if attr not in ("tables", "tabled_count")}
+        goal_state = tuple(getattr(self.goal, attr) for attr in Goal.__slots__)
+        return pickle.dumps((self.parsed_problem_CDL["cdl"], condition_state, goal_state),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
     def _construction_init(self):
         """
         Constructive process.
@@ -319,10 +361,9 @@ class Problem:
                     if not (unit[1] == comb[1] and unit[2] == comb[0] and unit[0] != comb[2]):  # ensure adjacent
                         continue
 
-                    angles = self.condition.get_items_by_predicate("Angle")
-                    if (unit[0], unit[1], comb[2]) in angles or \
-                            (unit[0], comb[2], unit[1]) in angles or \
-                            (comb[2], unit[0], unit[1]) in angles:
+                    if self.condition.has("Angle", (unit[0], unit[1], comb[2])) or \
+                            self.condition.has("Angle", (unit[0], comb[2], unit[1])) or \
+                            self.condition.has("Angle", (comb[2], unit[0], unit[1])):
                         continue
 
                     new_angle = (unit[0], unit[1], comb[2])
@@ -473,67 +514,103 @@ class Problem:
         :param skip_check: <bool>, set to True when you are confident that the format of item must be legal.
         :return: True or False.
         """
-        if not skip_check:
-            checked, predicate = self.check(predicate, item, premise, theorem)
-            if not checked:
-                return False
-        else:
-            checked, predicate = True, predicate
+        return self.add_batch([(predicate, item, premise, theorem)], skip_check)[0]
 
-        added, _id = self.condition.add(predicate, item, premise, theorem)
-        if added:
-            if predicate == "Equation":  # preset Equation
-                return True
+    def add_batch(self, conditions, skip_check=False):
+        """
+        Add a batch of items, such as all conclusions of one theorem, in one step.
+        Condition expansion runs as a worklist in the same order as adding items one by one,
+        and all new conditions are committed to <Condition> together.
+        :param conditions: <list> of (predicate, item, premise, theorem).
+        :param skip_check: <bool>, set to True when you are confident that the format of items must be legal.
+        :return added: <list> of <bool>, indicate whether each given item was added.
+        """
+        added = []
+        staged = {}  # {(predicate, item): (predicate, item, premise, theorem)}, item of Equation is <str>
+        for predicate, item, premise, theorem in conditions:
+            worklist = [(predicate, item, premise, theorem, skip_check)]
+            added.append(False)
+            first_id = self.condition.id_count + len(staged)  # id of the given item if it is added
+            while len(worklist) > 0:
+                predicate, item, premise, theorem, skip = worklist.pop()
+                if not skip:
+                    checked, predicate = self.check(predicate, item, premise, theorem)
+                    if not checked:
+                        continue
 
-            if predicate in self.parsed_predicate_GDL["Preset"]["BasicEntity"]:  # preset BasicEntity
-                if predicate == "Line":
-                    self.condition.add("Line", item[::-1], (_id,), ("extended", None, None))
-                    self.condition.add("Point", (item[0],), (_id,), ("extended", None, None))
-                    self.condition.add("Point", (item[1],), (_id,), ("extended", None, None))
-                elif predicate == "Arc":
-                    self.condition.add("Point", (item[1],), (_id,), ("extended", None, None))
-                    self.condition.add("Point", (item[2],), (_id,), ("extended", None, None))
-                elif predicate == "Angle":
-                    self.add("Line", (item[0], item[1]),
-                             (_id,), ("extended", None, None), skip_check=True)
-                    self.add("Line", (item[1], item[2]),
-                             (_id,), ("extended", None, None), skip_check=True)
-                elif predicate == "Polyhedron":
-                    l = len(item)
-                    for bias in range(1, l):  # all forms
-                        new_item = tuple([item[(i + bias) % l] for i in range(l)])
-                        self.condition.add("Polyhedron", new_item, (_id,), ("extended", None, None))
-                elif predicate == "Polygon":
-                    l = len(item)
-                    for bias in range(1, l):  # all forms
-                        new_item = tuple([item[(i + bias) % l] for i in range(l)])
-                        self.condition.add("Polygon", new_item, (_id,), ("extended", None, None))
-                return True  # Point and Circle no need to extend
-
-            if predicate in self.parsed_predicate_GDL["Entity"]:  # user defined Entity
-                item_GDL = self.parsed_predicate_GDL["Entity"][predicate]
-            else:  # user defined Relation
-                item_GDL = self.parsed_predicate_GDL["Relation"][predicate]
-
-            predicate_vars = item_GDL["vars"]
-            letters = {}  # used for vars-letters replacement
-            for i in range(len(predicate_vars)):
-                letters[predicate_vars[i]] = item[i]
+                _id = self._stage(predicate, item, premise, theorem, staged)
+                if _id is None:
+                    continue
+                if _id == first_id:
+                    added[-1] = True
+                if predicate == "Equation":  # preset Equation
+                    continue
+
+                extended = []  # items expanded with <Problem.add>, [(predicate, item, skip_check)]
+                if predicate in self.parsed_predicate_GDL["Preset"]["BasicEntity"]:  # preset BasicEntity
+                    if predicate == "Line":
+                        self._stage("Line", item[::-1], (_id,), ("extended", None, None), staged)
+                        self._stage("Point", (item[0],), (_id,), ("extended", None, None), staged)
+                        self._stage("Point", (item[1],), (_id,), ("extended", None, None), staged)
+                    elif predicate == "Arc":
+                        self._stage("Point", (item[1],), (_id,), ("extended", None, None), staged)
+                        self._stage("Point", (item[2],), (_id,), ("extended", None, None), staged)
+                    elif predicate == "Angle":
+                        extended.append(("Line", (item[0], item[1]), True))
+                        extended.append(("Line", (item[1], item[2]), True))
+                    elif predicate in ["Polyhedron", "Polygon"]:
+                        l = len(item)
+                        for bias in range(1, l):  # all forms
+                            new_item = tuple([item[(i + bias) % l] for i in range(l)])
+                            self._stage(predicate, new_item, (_id,), ("extended", None, None), staged)
+                else:  # user defined Entity and Relation
+                    if predicate in self.parsed_predicate_GDL["Entity"]:
+                        item_GDL = self.parsed_predicate_GDL["Entity"][predicate]
+                    else:
+                        item_GDL = self.parsed_predicate_GDL["Relation"][predicate]
 
-            for para_list in item_GDL["multi"]:  # multi
-                self.condition.add(predicate, tuple(letters[i] for i in para_list), (_id,), ("extended", None, None))
+                    predicate_vars = item_GDL["vars"]
+                    letters = {}  # used for vars-letters replacement
+                    for i in range(len(predicate_vars)):
+                        letters[predicate_vars[i]] = item[i]
 
-            for extended_predicate, para in item_GDL["extend"]:  # extended
-                if extended_predicate == "Equal":
-                    self.add("Equation", get_equation_from_tree(self, para, True, letters),
-                             (_id,), ("extended", None, None))
-                else:
-                    self.add(extended_predicate, tuple(letters[i] for i in para),
-                             (_id,), ("extended", None, None))
+                    for para_list in item_GDL["multi"]:  # multi
+                        self._stage(predicate, tuple(letters[i] for i in para_list),
+                                    (_id,), ("extended", None, None), staged)
 
-            return True
+                    for extended_predicate, para in item_GDL["extend"]:  # extended
+                        if extended_predicate == "Equal":
+                            extended.append(("Equation", get_equation_from_tree(self, para, True, letters), False))
+                        else:
+                            extended.append((extended_predicate, tuple(letters[i] for i in para), False))
 
-        return False
+                for extended_predicate, extended_item, extended_skip in extended[::-1]:  # keep adding order
+                    worklist.append((extended_predicate, extended_item, (_id,), ("extended", None, None),
+                                     extended_skip))
+
+        self.condition.add_batch(list(staged.values()))
+        return added
+
+    def _stage(self, predicate, item, premise, theorem, staged):
+        """
+        Stage one condition for <Problem.add_batch> and return its id, return None when it already exists.
+        Called by <Problem.add_batch>.
+        """
+        if predicate == "Equation":
+            if item is None:
+                return None
+            key = (predicate, str(item))
+            if key in staged or ("Equation", str(-item)) in staged:
+                return None
+        else:
+            key = (predicate, item)
+            if key in staged:
+                return None
+        if self.condition.has(predicate, item):
+            return None
+
+        staged[key] = (predicate, item, premise, theorem)
+        return self.condition.id_count + len(staged) - 1
 
     def check(self, predicate, item, premise=None, theorem=None):
         """
@@ -545,46 +622,14 @@ class Problem:
         :return: (True/False, predicate) tuple. If predicate was replaced, returns the new predicate name.
         """
         if predicate not in self.condition.items_group:  # predicate must be defined
-            # Try to find predicates that match the base name
-            matched_predicate = None
-
-            # Check Attribution first
-            for attr_pred in self.parsed_predicate_GDL["Attribution"]:
-                if attr_pred == predicate or attr_pred.startswith(predicate + "("):
-                    matched_predicate = attr_pred
-                    print(f"Found matching attribution predicate: {attr_pred} for {predicate}")
-                    break
-
-            # If not found in Attribution, check parsed Entity and Relation
-            if matched_predicate is None:
-                print(f"Checking Entity and Relation for predicate: {predicate}")
-                print(f"Entity keys: {list(self.parsed_predicate_GDL.get('Entity', {}).keys())[:10]}")
-                print(f"Relation keys: {list(self.parsed_predicate_GDL.get('Relation', {}).keys())[:10]}")
-                # Check Entity - look for keys that start with the predicate name
-                for entity_key in self.parsed_predicate_GDL.get("Entity", {}):
-                    if entity_key.startswith(predicate + "("):
-                        matched_predicate = entity_key
-                        print(f"Found matching entity predicate: {entity_key} for {predicate}")
-                        break
-
-                # Check Relation - look for keys that start with the predicate name
-                if matched_predicate is None:
-                    for relation_key in self.parsed_predicate_GDL.get("Relation", {}):
-                        if relation_key.startswith(predicate + "("):
-                            matched_predicate = relation_key
-                            print(f"Found matching relation predicate: {relation_key} for {predicate}")
-                            break
-
-                if matched_predicate is None:
-                    print(f"Predicate {predicate} not found in Entity or Relation")
-
-            if matched_predicate is None:
+            matched_predicate = self.parsed_predicate_GDL["Alias"].get(predicate)
+            if matched_predicate is None or matched_predicate not in self.condition.items_group:
                 e_msg = "Predicate '{}' not defined in current predicate GDL.".format(predicate)
                 raise Exception(e_msg)
-            else:
-                # Replace predicate with the matched predicate
-                predicate = matched_predicate
-                print(f"Replaced predicate: {predicate}")
+            w_msg = "Predicate '{}' resolved to '{}'.".format(predicate, matched_predicate)
+            warnings.warn(w_msg)
+            predicate = matched_predicate  # replace predicate with the matched predicate
+
         #if not self.ee_check(predicate, item):  # ee check
            #w_msg = "EE check not passed: [{}, {}, {}, {}]".format(predicate, item, premise, theorem)
             #warnings.warn(w_msg)
@@ -616,7 +661,7 @@ class Problem:
             letters[item_GDL["vars"][i]] = item[i]
 
         for name, para in item_GDL["ee_check"]:
-            if tuple(letters[i] for i in para) not in self.condition.get_items_by_predicate(name):
+            if not self.condition.has(name, tuple(letters[i] for i in para)):
                 return False
         return True
 
@@ -676,12 +721,12 @@ class Problem:
             return False
 
         if "fv_check" in item_GDL:  # fv check, more stringent than default check 3
-            checked = []
+            checked = {}  # {point: order of first occurrence}
             result = []
             for i in item:
                 if i not in checked:
-                    checked.append(i)
-                result.append(str(checked.index(i)))
+                    checked[i] = str(len(checked))
+                result.append(checked[i])
             if "".join(result) in item_GDL["fv_check"]:
                 return True
             return False
@@ -750,29 +795,32 @@ class Problem:
             warnings.warn(msg)
             return None
 
-        if (attr, item) in self.condition.sym_of_attr:  # already has sym
-            return self.condition.sym_of_attr[(attr, item)]
-
         if attr == "Free":
+            if (attr, item) in self.condition.sym_of_attr:  # already has sym
+                return self.condition.sym_of_attr[(attr, item)]
             sym = symbols("".join(item))
             self.condition.sym_of_attr[(attr, item)] = sym  # add sym
             self.condition.value_of_sym[sym] = None  # init symbol's value
             self.condition.attr_of_sym[sym] = (attr, (item,))  # add attr
             return sym
 
+        coded_item = self.condition.encode(item)
+        if (attr, coded_item) in self.condition.sym_of_attr:  # already has sym
+            return self.condition.sym_of_attr[(attr, coded_item)]
+
         if attr == "MeasureOfAngle":  # align angle's sym
             sym = symbols("ma_" + "".join(item).lower(), positive=True)  # init sym
             self.condition.value_of_sym[sym] = None  # init symbol's value
             same_angles = self._get_same_angles(item)
             for same_angle in same_angles:
-                self.condition.sym_of_attr[("MeasureOfAngle", same_angle)] = sym
+                self.condition.sym_of_attr[("MeasureOfAngle", self.condition.encode(same_angle))] = sym
             self.condition.attr_of_sym[sym] = ("MeasureOfAngle", tuple(same_angles))
             return sym
 
         attr_GDL = self.parsed_predicate_GDL["Attribution"][attr]
-        if (attr, item) not in self.condition.sym_of_attr:  # No symbolic representation, initialize one.
+        if (attr, coded_item) not in self.condition.sym_of_attr:  # No symbolic representation, initialize one.
             sym = symbols(attr_GDL["sym"] + "_" + "".join(item).lower(), positive=True)
-            self.condition.sym_of_attr[(attr, item)] = sym  # add sym
+            self.condition.sym_of_attr[(attr, coded_item)] = sym  # add sym
             self.condition.value_of_sym[sym] = None  # init symbol's value
 
             extend_items = [item]
@@ -783,12 +831,32 @@ class Problem:
 
             for multi in attr_GDL["multi"]:
                 extended_item = [letters[i] for i in multi]  # extend item
-                self.condition.sym_of_attr[(attr, tuple(extended_item))] = sym  # multi representation
+                self.condition.sym_of_attr[(attr, self.condition.encode(extended_item))] = sym  # multi representation
                 extend_items.append(tuple(extended_item))
 
             self.condition.attr_of_sym[sym] = (attr, tuple(extend_items))  # add attr
             return sym
 
+    def align_syms(self, syms):
+        """
+        Create syms reported by other copy of this problem, such as a forked worker, and return the replacement
+        from their syms to the syms of this problem. Sym name depends on which representation of the attr is
+        created first, so the same attr may have different syms in different copies.
+        :param syms: <list> of (attr, item, sym), syms created in other copy, item is the key of sym_of_attr.
+        :return replace: <dict>, {sym: sym of this problem}, only contains syms that differ.
+        """
+        replace = {}
+        for attr, item, sym in syms:
+            if (attr, item) in self.condition.sym_of_attr:
+                problem_sym = self.condition.sym_of_attr[(attr, item)]
+            elif attr == "Free":
+                problem_sym = self.get_sym_of_attr(attr, item)
+            else:
+                problem_sym = self.get_sym_of_attr(attr, self.condition.decode(item))
+            if problem_sym is not None and problem_sym != sym:
+                replace[sym] = problem_sym
+        return replace
+
     def set_value_of_sym(self, sym, value, premise):
         """
         Set value of sym.
@@ -829,17 +897,64 @@ class Problem:
                         self.goal.solved_answer = result
 
                     eq = self.goal.item - result
-                    if eq in self.condition.get_items_by_predicate("Equation"):
+                    if ("Equation", str(eq)) in self.condition.id_of_item:
                         self.goal.premise = self.condition.get_premise_by_predicate_and_item("Equation", eq)
                         self.goal.theorem = self.condition.get_theorem_by_predicate_and_item("Equation", eq)
                     else:
                         self.goal.premise = tuple(premise)
                         self.goal.theorem = ("solve_eq", None, None)
         elif self.goal.type == "logic":  # logic relation
-            if self.goal.answer in self.condition.get_items_by_predicate(self.goal.item):
+            if self.condition.has(self.goal.item, self.goal.answer):
                 self.goal.solved = True
                 self.goal.solved_answer = self.goal.answer
                 self.goal.premise = self.condition.get_premise_by_predicate_and_item(self.goal.item, self.goal.answer)
                 self.goal.theorem = self.condition.get_theorem_by_predicate_and_item(self.goal.item, self.goal.answer)
 
         self.step("check_goal", time.time() - s_start_time)
+
+
+def init_problem(parsed_predicate_GDL, parsed_theorem_GDL, parsed_problem_CDL, snapshot_filename=None):
+    """
+    Return problem loaded through parsed_problem_CDL with its equations solved.
+    :param parsed_predicate_GDL: parsed predicate GDL.
+    :param parsed_theorem_GDL: parsed theorem GDL.
+    :param parsed_problem_CDL: parsed problem CDL.
+    :param snapshot_filename: <str>, problem is restored from this snapshot file when it is saved from the same
+    problem CDL, otherwise constructed and saved to it, see <get_snapshot_filename>. Set None not to use snapshot.
+    """
+    problem = Problem()
+    if snapshot_filename is not None and os.path.exists(snapshot_filename):
+        try:
+            with open(snapshot_filename, "rb") as f:
+                problem.load_problem_by_snapshot(
+                    parsed_predicate_GDL, parsed_theorem_GDL, parsed_problem_CDL, f.read())
+            return problem
+        except Exception:  # broken or stale snapshot, construct again and overwrite it
+            problem = Problem()
+
+    problem.load_problem_by_fl(parsed_predicate_GDL, parsed_theorem_GDL, parsed_problem_CDL)
+    EqKiller.solve_equations(problem)
+    if snapshot_filename is not None:
+        tmp_filename = "{}.{}.tmp".format(snapshot_filename, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(snapshot_filename), exist_ok=True)
+            with open(tmp_filename, "wb") as f:
+                f.write(problem.get_snapshot())
+            os.replace(tmp_filename, snapshot_filename)
+        except OSError as e:
+            w_msg = "Can't save problem snapshot to '{}': {}.".format(snapshot_filename, e)
+            warnings.warn(w_msg)
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+    return problem
+
+
+def get_snapshot_filename(snapshot_path, pid, gdl_hash):
+    """
+    Snapshot file of problem pid, snapshots are valid only for the GDL and formalgeo version of gdl_hash and
+    the snapshot format of <Problem.snapshot_version>.
+    :param snapshot_path: <str>, path of snapshot files, such as 'datasets/formalgeo7k_v2/snapshots'.
+    :param pid: problem id.
+    :param gdl_hash: <str>, see <formalgeo.parse.parse_gdl.get_gdl_hash>.
+    """
+    return os.path.join(snapshot_path, "{}_{}_v{}.pkl".format(pid, gdl_hash, Problem.snapshot_version))
@@ -1,8 +1,9 @@
 from formalgeo.problem import Problem
 from formalgeo.core import EquationKiller as EqKiller
-from formalgeo.parse import parse_predicate_gdl, parse_theorem_gdl, parse_problem_cdl
+from formalgeo.parse import parse_predicate_gdl, parse_gdl, parse_problem_cdl
 from formalgeo.tools import rough_equal, show_solution
 from formalgeo.solver import Interactor
+import os
 import json
 import warnings
 from copy import deepcopy
@@ -18,28 +19,26 @@ class GeometrySolver:
         :param predicate_gdl_path: 谓词定义GDL文件路径
         :param theorem_gdl_path: 定理定义GDL文件路径
         """
-        self.predicate_gdl = self._load_predicate_gdl(predicate_gdl_path)
-        self.theorem_gdl = self._load_theorem_gdl(theorem_gdl_path)
+        self.predicate_gdl, self.theorem_gdl = self._load_gdl(predicate_gdl_path, theorem_gdl_path)
         self.problem = None
         self.solving_history = []
         
-    def _load_predicate_gdl(self, path):
-        """加载谓词定义"""
+    def _load_gdl(self, predicate_gdl_path, theorem_gdl_path):
+        """加载谓词与定理定义，解析结果缓存在 gdl/ 同级的 gdl_cache/ 中"""
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return parse_predicate_gdl(json.load(f))
+            with open(predicate_gdl_path, 'r', encoding='utf-8') as f:
+                predicate_gdl = json.load(f)
         except Exception as e:
             warnings.warn(f"加载谓词定义失败: {str(e)}")
-            return None
-    
-    def _load_theorem_gdl(self, path):
-        """加载定理定义"""
+            return None, None
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return parse_theorem_gdl(json.load(f),self.predicate_gdl)
+            with open(theorem_gdl_path, 'r', encoding='utf-8') as f:
+                theorem_gdl = json.load(f)
         except Exception as e:
             warnings.warn(f"加载定理定义失败: {str(e)}")
-            return None
+            return parse_predicate_gdl(predicate_gdl), None
+        cache_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(predicate_gdl_path))), "gdl_cache")
+        return parse_gdl(predicate_gdl, theorem_gdl, cache_path)
     
     def load_problem(self, problem_data):
         """
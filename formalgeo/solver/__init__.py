@@ -5,13 +5,15 @@
 """
 'solver' invokes other modules to enable interactive problem-solving and automated problem-solving.
 The automated problem-solving implements both forward search and backward search, allowing for the
-configuration of various search strategies (breadth-first, depth-first, random, beam).
+configuration of various search strategies (breadth-first, depth-first, random, beam). Bidirectional search
+runs both on the same problem and stops when they meet.
 """
 
 __all__ = [
-    "Interactor", "ForwardSearcher", "BackwardSearcher"
+    "Interactor", "ForwardSearcher", "BackwardSearcher", "BidirectionalSearcher"
 ]
 
 from formalgeo.solver.interactive import Interactor
 from formalgeo.solver.forward_search import ForwardSearcher
 from formalgeo.solver.backward_search import BackwardSearcher
+from formalgeo.solver.bidirectional_search import BidirectionalSearcher
@@ -1,11 +1,17 @@
+import gc
 import time
 import copy
 import random
+import warnings
+import multiprocessing
+import psutil
 from enum import Enum
+from collections import deque
 from itertools import permutations
-from formalgeo.problem import Problem
+from formalgeo.problem import init_problem, get_snapshot_filename
 from formalgeo.core import EquationKiller as EqKiller
-from formalgeo.parse import parse_predicate_gdl, parse_theorem_gdl, parse_problem_cdl, get_equation_from_tree
+from formalgeo.parse import parse_gdl, parse_problem_cdl, get_equation_from_tree
+from formalgeo.parse.parse_gdl import get_gdl_hash
 from formalgeo.tools import get_used_pid_and_theorem, debug_print
 
 
@@ -33,14 +39,85 @@ def get_p2t_map_bw(t_info, parsed_theorem_GDL):
     return p2t_map_bw
 
 
+_forked_context = None  # <SearchContext> inherited by forked workers, see <BackwardSearcher.open_pool>
+_synced_snapshot = None  # (snapshot, sym_count), problem snapshot that forked worker is synced to
+
+
+def _find_sub_goals_in_worker(task):
+    """Sync forked problem to the snapshot, return [results] of finding sub goals and newly created syms."""
+    global _synced_snapshot
+    snapshot, goals = task
+    problem = _forked_context.problem
+    if _synced_snapshot != (snapshot, len(problem.condition.sym_of_attr)):  # resync when syms created by worker
+        problem.update_by_snapshot(snapshot)
+        _forked_context.finder.memo = {}  # memoized sub goals may use syms that parent aligns differently
+        _synced_snapshot = (snapshot, len(problem.condition.sym_of_attr))
+    sym_count = len(problem.condition.sym_of_attr)
+    results = [_forked_context.finder.find_all_sub_goals(predicate, item, problem) for predicate, item in goals]
+    new_syms = [(attr, item, problem.condition.sym_of_attr[(attr, item)])
+                for attr, item in list(problem.condition.sym_of_attr)[sym_count:]]
+    return results, new_syms
+
+
+def _enumerate_worker(task):
+    """Run <_find_sub_goals_in_worker> with the task index, used by unordered parallel backward search."""
+    i, task = task
+    return i, _find_sub_goals_in_worker(task)
+
+
 class GoalFinder:
 
     def __init__(self, parsed_theorem_GDL, p2t_map):
         self.parsed_theorem_GDL = parsed_theorem_GDL
         self.p2t_map = p2t_map
+        self.para_constraints = {}  # {(t_name, t_branch): [(predicate, var_index)]}, see <get_para_constraints>
+        self.relevant_predicates = {}  # {predicate: (relevant_predicate)}, see <get_condition_version>
+        self.memo = {}  # {(predicate, item): (version, sub_goals)}, item of Equation is <str>
+
+    def reset(self):
+        """Clear memoized sub goals, called when a new problem is loaded."""
+        self.memo = {}
+
+    def get_condition_version(self, predicate, problem):
+        """
+        Version of the conditions that sub goals of predicate depend on. Sub goals of a logic goal only depend
+        on points and the items required by the theorems that conclude it, so new facts of other predicates
+        don't invalidate them. Sub goals of an algebra goal also depend on simplified equations, which may
+        relate the goal to any attr, so theorems of all attrs are considered.
+        """
+        condition = problem.condition
+        if predicate not in self.relevant_predicates:
+            if predicate == "Equation":
+                theorems = set(t for p in self.p2t_map for t in self.p2t_map[p])
+            else:
+                theorems = self.p2t_map.get(predicate, [])
+            relevant = {"Point"}
+            for t_name, t_branch in theorems:
+                constraints = self.get_para_constraints(t_name, t_branch, problem.parsed_predicate_GDL)
+                relevant |= set(name for name, _ in constraints)
+            self.relevant_predicates[predicate] = tuple(sorted(relevant))
+
+        version = tuple(len(condition.ids_of_predicate.get(p, ())) for p in self.relevant_predicates[predicate])
+        if predicate == "Equation":
+            return (condition.eq_version,) + version
+        return version
 
     def find_all_sub_goals(self, predicate, item, problem):
-        """return [(sub_goals, (t_name, t_para, t_branch))]"""
+        """
+        Return [(t_name, t_branch, t_para, sub_goals)], memoized by (predicate, item) and condition version.
+        Only the latest version of each goal is kept, so the entry is replaced when relevant facts arrive.
+        """
+        key = (predicate, str(item)) if predicate == "Equation" else (predicate, item)
+        version = self.get_condition_version(predicate, problem)
+        if key in self.memo and self.memo[key][0] == version:
+            return self.memo[key][1]
+
+        results = self._find_all_sub_goals(predicate, item, problem)
+        self.memo[key] = (version, results)
+        return results
+
+    def _find_all_sub_goals(self, predicate, item, problem):
+        """return [(t_name, t_branch, t_para, sub_goals)]"""
         theorem_and_para = {}  # {(t_name, t_branch): set(t_paras)}
 
         if predicate == "Equation":  # algebra goal
@@ -67,8 +144,7 @@ class GoalFinder:
                         for para in attr_to_paras[attr]:
                             t_para = [v if v not in attr_vars else para[attr_vars.index(v)] for v in t_vars]
                             t_paras.append(t_para)
-                    t_paras = GoalFinder.theorem_para_completion(
-                        t_paras, problem.condition.get_items_by_predicate("Point"))
+                    t_paras = self.complete_theorem_paras(t_name, t_branch, t_paras, problem)
                     theorem_and_para[(t_name, t_branch)] |= t_paras
         else:  # logic goal
             if predicate not in self.p2t_map:
@@ -85,8 +161,7 @@ class GoalFinder:
                     t_para = [v if v not in item_vars else item[item_vars.index(v)] for v in t_vars]
                     t_paras.add(tuple(t_para))
 
-                t_paras = GoalFinder.theorem_para_completion(
-                    t_paras, problem.condition.get_items_by_predicate("Point"))
+                t_paras = self.complete_theorem_paras(t_name, t_branch, t_paras, problem)
 
                 theorem_and_para[(t_name, t_branch)] |= t_paras
 
@@ -95,23 +170,116 @@ class GoalFinder:
     @staticmethod
     def theorem_para_completion(t_paras, points):
         """
-        Replace free vars with points.
-        >> theorem_para_completion([['a', 'R', 'S']], ['A', 'R', 'S'])
-        >> [['A', 'R', 'S'], ['R', 'R', 'S'], ['S', 'R', 'S']]
+        Replace free vars with point codes, free vars are <str> and bound paras are point codes.
+        >> theorem_para_completion([['a', 17, 18]], [0, 17, 18])
+        >> {(0, 17, 18), (17, 17, 18), (18, 17, 18)}
         """
-        points = [points[i][0] for i in range(len(points))]
         results = set()
         for t_para in t_paras:
-            vacant_index = []
-            for i in range(len(t_para)):
-                if t_para[i].islower():
-                    vacant_index.append(i)
+            vacant_index = [i for i in range(len(t_para)) if isinstance(t_para[i], str)]
+            result = list(t_para)
             for per_para in permutations(points, len(vacant_index)):
-                result = [t_para[i] if i not in vacant_index else per_para[vacant_index.index(i)]
-                          for i in range(len(t_para))]
+                for i, point in zip(vacant_index, per_para):
+                    result[i] = point
                 results.add(tuple(result))
         return results
 
+    def get_para_constraints(self, t_name, t_branch, parsed_predicate_GDL):
+        """
+        Return the existing items that products and logic constraints of theorem require, that is, the items
+        themselves for BasicEntity and Construction, and the items of ee_check for Entity, Relation and Attribution.
+        :return constraints: <list> of (predicate, var_index), var_index is the index of item's vars in theorem vars.
+        """
+        if (t_name, t_branch) in self.para_constraints:
+            return self.para_constraints[(t_name, t_branch)]
+
+        t_vars = self.parsed_theorem_GDL[t_name]["vars"]
+        gpl = self.parsed_theorem_GDL[t_name]["body"][t_branch]
+        constraints = []
+        for predicate, item_vars in list(gpl["products"]) + list(gpl["logic_constraints"]):
+            if "~" in predicate or predicate == "Shape":  # oppose and Shape can't bind points
+                continue
+            if predicate in parsed_predicate_GDL["Preset"]["BasicEntity"] or \
+                    predicate in parsed_predicate_GDL["Preset"]["Construction"]:
+                required = [(predicate, tuple(item_vars))]
+            else:
+                if predicate in parsed_predicate_GDL["Entity"]:
+                    item_GDL = parsed_predicate_GDL["Entity"][predicate]
+                elif predicate in parsed_predicate_GDL["Relation"]:
+                    item_GDL = parsed_predicate_GDL["Relation"][predicate]
+                elif predicate in parsed_predicate_GDL["Attribution"]:
+                    item_GDL = parsed_predicate_GDL["Attribution"][predicate]
+                else:
+                    continue
+                letters = {}  # used for vars-letters replacement
+                for i in range(len(item_GDL["vars"])):
+                    letters[item_GDL["vars"][i]] = item_vars[i]
+                required = [(name, tuple(letters[i] for i in para)) for name, para in item_GDL["ee_check"]]
+
+            for name, para in required:
+                if name == "Shape" or not set(para) <= set(t_vars):
+                    continue
+                constraint = (name, tuple(t_vars.index(v) for v in para))
+                if constraint not in constraints:
+                    constraints.append(constraint)
+
+        self.para_constraints[(t_name, t_branch)] = constraints
+        return constraints
+
+    def complete_theorem_paras(self, t_name, t_branch, t_paras, problem):
+        """
+        Replace free vars with points by joining against the existing items that theorem's products and logic
+        constraints require, so candidates grow with the facts that can match instead of all point permutations.
+        Free vars that no required item covers are completed by <theorem_para_completion>.
+        Points of free vars are different from each other, the same as <theorem_para_completion>.
+        Paras are joined as point codes and decoded to points only in results.
+        :return results: <set> of t_para.
+        """
+        condition = problem.condition
+        constraints = self.get_para_constraints(t_name, t_branch, problem.parsed_predicate_GDL)
+        codes = condition.encode(tuple(item[0] for item in condition.get_items_by_predicate("Point")))
+
+        results = set()
+        for t_para in t_paras:
+            vacant_index = [i for i in range(len(t_para)) if t_para[i].islower()]
+            if len(vacant_index) == 0:
+                results.add(tuple(t_para))
+                continue
+
+            partials = [[v if v.islower() else condition.encode((v,))[0] for v in t_para]]
+            for predicate, var_index in constraints:
+                table = condition.get_table(predicate, len(var_index))
+                new_partials = []
+                for partial in partials:
+                    bound = tuple(k for k in range(len(var_index)) if not isinstance(partial[var_index[k]], str))
+                    if len(bound) == len(var_index):  # all bound, check existence
+                        if tuple(partial[i] for i in var_index) in table.get_index(bound):
+                            new_partials.append(partial)
+                        continue
+
+                    if len(bound) == 0:
+                        rows = range(len(table))
+                    else:
+                        key = tuple(partial[var_index[k]] for k in bound)
+                        rows = table.get_index(bound).get(key, [])
+                    for row in rows:
+                        new_partial = list(partial)
+                        for k in range(len(var_index)):
+                            code = table.columns[k][row]
+                            if isinstance(new_partial[var_index[k]], str):
+                                new_partial[var_index[k]] = code
+                            elif new_partial[var_index[k]] != code:  # the same var appears more than once
+                                break
+                        else:
+                            new_partials.append(new_partial)
+                partials = new_partials
+
+            for partial in GoalFinder.theorem_para_completion(partials, codes):
+                if len(set(partial[i] for i in vacant_index)) == len(vacant_index):
+                    results.add(condition.decode(partial))
+
+        return results
+
     def gen_sub_goals(self, theorem_and_para, problem):
         """
         Construct and return legitimate sub goal.
@@ -171,23 +339,41 @@ class NodeState(Enum):
     fail = 4
 
 
+class SearchContext:
+    __slots__ = ("problem", "finder", "node_map", "goal_table", "search_stack", "snc", "delivered_count",
+                 "depth_limit", "cutoff", "debug")
+
+    def __init__(self, problem, finder, depth_limit, debug):
+        """Shared state of one backward search, referenced by all <Node> and <SuperNode>."""
+        self.problem = problem  # class <Problem>
+        self.finder = finder  # class <GoalFinder>
+        self.node_map = {}  # {(predicate, item) or sym: [class <Node>]}
+        self.goal_table = {}  # {(predicate, item): class <Node>}, transposition table, item of Equation is <str>
+        self.search_stack = deque()  # deque of class <SuperNode>, dead ones are dropped lazily when popped
+        self.snc = {}  # {depth: super_node_count}
+        self.delivered_count = 0  # <int>, conditions whose id less than it are delivered to Nodes
+        self.depth_limit = depth_limit  # <int>, SuperNodes deeper than it are not generated
+        self.cutoff = False  # <bool>, set True when some Node is not expanded because of <depth_limit>
+        self.debug = debug
+
+
 class Node:
-    def __init__(self, super_node, problem, predicate, item, node_map, finder, debug):
+    __slots__ = ("state", "super_node", "children", "children_t_msg", "predicate", "item", "premise", "context",
+                 "canonical", "twins")
+
+    def __init__(self, super_node, predicate, item, context):
         """Init node and set node state."""
         self.state = NodeState.to_be_expanded
         self.super_node = super_node  # class <SuperNode>
         self.children = []  # list of class <SuperNode>
         self.children_t_msg = set()  # set of (t_name, t_branch, t_para)
 
-        self.problem = problem
         self.predicate = predicate
         self.item = item
         self.premise = []
 
-        self.finder = finder
-        self.node_map = node_map
-
-        self.debug = debug
+        self.context = context  # class <SearchContext>
+        node_map = context.node_map
 
         if predicate == "Equation":  # process 1
             for sym in self.item.free_symbols:
@@ -204,9 +390,20 @@ class Node:
                 node_map[(predicate, item)].append(self)
 
             if predicate in ["Point", "Line", "Arc", "Angle", "Polygon","Polyhedron","Circle","Sphere","Plane","Coplanar","Cospherical","Collinear", "Cocircular"] and \
-                    item not in self.problem.condition.get_items_by_predicate(predicate):
+                    not context.problem.condition.has(predicate, item):
                 self.state = NodeState.fail
 
+        key = (predicate, str(item)) if predicate == "Equation" else (predicate, item)
+        self.canonical = context.goal_table.get(key)  # class <Node> that expands this goal, None if self
+        self.twins = []  # list of class <Node>, other Nodes of the same goal, only used by canonical Node
+        if self.canonical is None:
+            context.goal_table[key] = self
+        else:
+            self.canonical.twins.append(self)
+            if self.canonical.state == NodeState.success and self.state != NodeState.fail:
+                self.state = NodeState.success
+                self.premise = self.canonical.premise
+
         self.check_goal()
 
     def check_state(self):  # process 3
@@ -228,70 +425,110 @@ class Node:
         if fail and len(self.children) > 0 and self.predicate != "Equation":
             self.state = NodeState.fail
             update = True
+            self.release_twins()  # failure may depend on the path (ring), so twins expand by themselves
 
         if update:
             self.super_node.check_state()
 
+    def release_twins(self):
+        """Twins waiting for this Node to expand their goal expand by themselves."""
+        for twin in self.twins:
+            if twin.state == NodeState.expanded and len(twin.children) == 0:
+                twin.state = NodeState.to_be_expanded
+                twin.expand()
+
+    def defer_to_canonical(self):
+        """
+        Return True when the goal is expanded by canonical Node, so this Node needn't expand it. Canonical Node
+        that failed, or produced no children (such as cut off by <depth_limit>), or is an ancestor of this Node
+        (its success depends on this Node) doesn't expand the goal for this Node.
+        """
+        canonical = self.canonical
+        if canonical is None or canonical.state != NodeState.expanded or len(canonical.children) == 0:
+            return False
+        node = self.super_node.father_node
+        while node is not None:
+            if node is canonical:
+                return False
+            node = node.super_node.father_node
+        return True
+
+    def share_success(self):
+        """Set all Nodes of the same goal success and propagate up, success doesn't depend on the path."""
+        canonical = self if self.canonical is None else self.canonical
+        for node in [canonical] + canonical.twins:
+            if node is self or node.state in [NodeState.success, NodeState.fail]:
+                continue
+            node.state = NodeState.success
+            node.premise = self.premise
+            node.super_node.check_state()
+
     def check_goal(self):  # process 1
         """Return update or not"""
         if self.state in [NodeState.success, NodeState.fail]:
             return False
 
         if self.predicate == "Equation":
-            result, premise = EqKiller.solve_target(self.item, self.problem)
+            result, premise = EqKiller.solve_target(self.item, self.context.problem)
             if result is None:
                 return False
 
             if result == 0:
                 self.state = NodeState.success
                 self.premise = premise
+                self.share_success()
             else:
                 self.state = NodeState.fail
         else:
-            if self.item not in self.problem.condition.get_items_by_predicate(self.predicate):
+            condition = self.context.problem.condition
+            if not condition.has(self.predicate, self.item):
                 return False
             self.state = NodeState.success
-            self.premise = [self.problem.condition.get_id_by_predicate_and_item(self.predicate, self.item)]
+            self.premise = [condition.get_id_by_predicate_and_item(self.predicate, self.item)]
+            self.share_success()
 
         return True
 
-    def expand(self, search_stack):  # process 1
+    def expand(self, results=None):  # process 1
+        """Expand node, <results> is sub goals found in advance (such as by parallel workers) or None."""
         if self.state in [NodeState.success, NodeState.fail]:
             return False
         self.state = NodeState.expanded
+        if self.defer_to_canonical():  # expanded by canonical Node
+            return False
 
         depth = self.super_node.pos[0] + 1
-        results = self.finder.find_all_sub_goals(self.predicate, self.item, self.problem)
+        if depth > self.context.depth_limit:  # Node stays expanded, and will be tried again when new facts come
+            self.context.cutoff = True
+            self.release_twins()  # shallower twins may be within depth_limit
+            return False
+        if results is None:
+            results = self.context.finder.find_all_sub_goals(self.predicate, self.item, self.context.problem)
         for t_name, t_branch, t_para, sub_goals in results:
             if (t_name, t_branch, t_para) in self.children_t_msg:
                 continue
             self.children_t_msg.add((t_name, t_branch, t_para))
 
-            super_node = SuperNode(self, self.problem, (t_name, t_branch, t_para), depth,
-                                   self.node_map, self.finder, self.debug, search_stack)
+            super_node = SuperNode(self, (t_name, t_branch, t_para), depth, self.context)
             self.children.append(super_node)
             super_node.add_nodes(sub_goals)
 
 
 class SuperNode:
-    snc = {}  # {depth: super_node_count}
+    __slots__ = ("state", "nodes", "father_node", "theorem", "pos", "context")
 
-    def __init__(self, father_node, problem, theorem, depth, node_map, finder, debug, search_stack):
+    def __init__(self, father_node, theorem, depth, context):
         self.state = NodeState.to_be_expanded
         self.nodes = []  # list of class <Node>
         self.father_node = father_node  # class <Node>
-        self.problem = problem
         self.theorem = theorem  # (t_name, t_branch, t_para)
-        if depth not in SuperNode.snc:
-            SuperNode.snc[depth] = 0
-        self.pos = (depth, SuperNode.snc[depth] + 1)  # (depth, node_number)
-        SuperNode.snc[depth] += 1
-        self.node_map = node_map
-        self.finder = finder
-        self.debug = debug
+        if depth not in context.snc:
+            context.snc[depth] = 0
+        self.pos = (depth, context.snc[depth] + 1)  # (depth, node_number)
+        context.snc[depth] += 1
 
-        self.search_stack = search_stack
-        search_stack.append(self)
+        self.context = context  # class <SearchContext>
+        context.search_stack.append(self)
 
     def add_nodes(self, sub_goals):
         father_super_nodes = []  # ensure no ring
@@ -307,7 +544,7 @@ class SuperNode:
                 father_super_nodes.append(super_node.father_node.super_node)
 
         for predicate, item in sub_goals:
-            node = Node(self, self.problem, predicate, item, self.node_map, self.finder, self.debug)
+            node = Node(self, predicate, item, self.context)
             self.nodes.append(node)
             if node.state == NodeState.fail:
                 break
@@ -337,28 +574,31 @@ class SuperNode:
                 self.apply_theorem()
                 self.father_node.check_state()
 
-    def expand(self):
+    def expand(self, results_of_nodes=None):
+        """Expand all nodes, <results_of_nodes> is sub goals of each node found in advance or None."""
         self.state = NodeState.expanded
 
         for i in range(len(self.nodes)):
             if self.state == NodeState.success:
                 break
-            debug_print(self.debug, "(pid={},depth={},branch={}/{},nodes={}/{}) Expanding Node ({}, {})".format(
-                self.problem.parsed_problem_CDL["id"], self.pos[0], self.pos[1], SuperNode.snc[self.pos[0]],
+            debug_print(self.context.debug, "(pid={},depth={},branch={}/{},nodes={}/{}) Expanding Node ({}, {})".format(
+                self.context.problem.parsed_problem_CDL["id"], self.pos[0], self.pos[1], self.context.snc[self.pos[0]],
                 i + 1, len(self.nodes), self.nodes[i].predicate, self.nodes[i].item))
-            self.nodes[i].expand(self.search_stack)
+            self.nodes[i].expand(None if results_of_nodes is None else results_of_nodes[i])
 
     def apply_theorem(self):
         if self.theorem is None or self.theorem[0].endswith("definition"):
             return
 
         t_name, t_branch, t_para = self.theorem
+        problem = self.context.problem
+        parsed_theorem_GDL = self.context.finder.parsed_theorem_GDL
 
         letters = {}  # used for vars-letters replacement
-        for i in range(len(self.finder.parsed_theorem_GDL[t_name]["vars"])):
-            letters[self.finder.parsed_theorem_GDL[t_name]["vars"][i]] = t_para[i]
+        for i in range(len(parsed_theorem_GDL[t_name]["vars"])):
+            letters[parsed_theorem_GDL[t_name]["vars"][i]] = t_para[i]
 
-        gpl = self.finder.parsed_theorem_GDL[t_name]["body"][t_branch]
+        gpl = parsed_theorem_GDL[t_name]["body"][t_branch]
         premises = []
         passed = True
 
@@ -368,26 +608,26 @@ class SuperNode:
                 oppose = True
                 predicate = predicate.replace("~", "")
             item = tuple(letters[i] for i in item)
-            has_item = self.problem.condition.has(predicate, item)
+            has_item = problem.condition.has(predicate, item)
             if has_item:
-                premises.append(self.problem.condition.get_id_by_predicate_and_item(predicate, item))
+                premises.append(problem.condition.get_id_by_predicate_and_item(predicate, item))
 
             if (not oppose and not has_item) or (oppose and has_item):
                 passed = False
                 break
 
         if not passed:
-            self.problem.step(self.theorem, 0)
+            problem.step(self.theorem, 0)
             return
 
         for equal, item in gpl["algebra_constraints"]:
             oppose = False
             if "~" in equal:
                 oppose = True
-            eq = get_equation_from_tree(self.problem, item, True, letters)
+            eq = get_equation_from_tree(problem, item, True, letters)
             solved_eq = False
 
-            result, premise = EqKiller.solve_target(eq, self.problem)
+            result, premise = EqKiller.solve_target(eq, problem)
             if result is not None and result == 0:
                 solved_eq = True
             premises += premise
@@ -397,196 +637,183 @@ class SuperNode:
                 break
 
         if not passed:
-            self.problem.step(self.theorem, 0)
+            problem.step(self.theorem, 0)
             return
 
+        conclusions = []
         for predicate, item in gpl["conclusions"]:
             if predicate == "Equal":  # algebra conclusion
-                eq = get_equation_from_tree(self.problem, item, True, letters)
-                self.problem.add("Equation", eq, premises, self.theorem)
+                eq = get_equation_from_tree(problem, item, True, letters)
+                conclusions.append(("Equation", eq, premises, self.theorem))
             else:  # logic conclusion
                 item = tuple(letters[i] for i in item)
-                self.problem.add(predicate, item, premises, self.theorem)
+                conclusions.append((predicate, item, premises, self.theorem))
+        problem.add_batch(conclusions)
 
-        EqKiller.solve_equations(self.problem)
-        self.problem.step(self.theorem, 0)
+        EqKiller.solve_equations(problem)
+        problem.step(self.theorem, 0)
 
 
 class BackwardSearcher:
+    parallel_count = 0  # <int>, process count used to expand SuperNodes, 0 means expand sequentially
+    parallel_deterministic = True  # <bool>, merge parallel results in pop order, otherwise in completion order
+    frontier_limit = None  # <int>, max count of SuperNodes waiting in search stack, None means no limit
+    memory_limit = None  # <int>, max RSS (MB) of search process, search tree is rebuilt when exceeded
 
-    def __init__(self, predicate_GDL, theorem_GDL, strategy, max_depth, beam_size, t_info, debug=False):
+    def __init__(self, predicate_GDL, theorem_GDL, strategy, max_depth, beam_size, t_info, debug=False,
+                 gdl_cache_path=None, snapshot_path=None):
         """
         Initialize Forward Searcher.
         :param predicate_GDL: predicate GDL.
         :param theorem_GDL: theorem GDL.
-        :param strategy: <str>, "dfs", "bfs", "rs", "bs".
+        :param strategy: <str>, "dfs", "bfs", "rs", "bs", "ids".
         :param max_depth: max search depth.
         :param beam_size: beam search size.
         :param t_info: <dict>, {t_name: (category_id, usage_count)}, user customization.
         :param debug: <bool>, set True when need print process information.
+        :param gdl_cache_path: <str>, path of parsed GDL cache, see <formalgeo.parse.parse_gdl>.
+        :param snapshot_path: <str>, path of initialized problem snapshots, see <formalgeo.problem.init_problem>.
         """
-        self.parsed_predicate_GDL = parse_predicate_gdl(predicate_GDL)
-        self.parsed_theorem_GDL = parse_theorem_gdl(theorem_GDL, self.parsed_predicate_GDL)
+        self.parsed_predicate_GDL, self.parsed_theorem_GDL = parse_gdl(
+            predicate_GDL, theorem_GDL, gdl_cache_path)
+        self.snapshot_path = snapshot_path
+        self.gdl_hash = None if snapshot_path is None else get_gdl_hash(predicate_GDL, theorem_GDL)
         self.max_depth = max_depth
         self.beam_size = beam_size
+        if strategy not in ("bfs", "dfs", "rs", "bs", "ids"):
+            e_msg = "Unknown backward search strategy '{}'.".format(strategy)
+            raise Exception(e_msg)
         self.strategy = strategy
         self.debug = debug
 
-        self.node_map = None
         self.finder = GoalFinder(self.parsed_theorem_GDL, get_p2t_map_bw(t_info, self.parsed_theorem_GDL))
 
         self.step_size = None
+        self.pool = None  # <Pool> of forked workers of current problem, see <open_pool>
         self.problem = None
         self.root = None
-        self.search_stack = None
+        self.context = None  # class <SearchContext>, shared by all nodes of current search
+        self.rebuild_step = 0  # <int>, step_size when search tree was built
+        self.rebuild_id_count = 0  # <int>, condition count when search tree was rebuilt for memory
+
+        self.trim_requested = False  # <bool>, set by <request_trim> from other threads, handled in search thread
+        self.stopped = False  # <bool>, set by <request_stop> from other threads, search stops at next step
 
         self.id = 0
 
+    def get_snapshot_filename(self, problem_CDL):
+        """Snapshot file of problem, None when not using snapshots."""
+        if self.snapshot_path is None:
+            return None
+        return get_snapshot_filename(self.snapshot_path, problem_CDL["problem_id"], self.gdl_hash)
+
     def init_search(self, problem_CDL):
         """Init and return a problem by problem_CDL."""
         s_start_time = time.time()
-        self.node_map = {}
-        self.step_size = 0
-        SuperNode.snc = {}
+        problem = init_problem(self.parsed_predicate_GDL, self.parsed_theorem_GDL, parse_problem_cdl(problem_CDL),
+                               self.get_snapshot_filename(problem_CDL))  # load problem
+        problem.step("init_problem", time.time() - s_start_time)  # save applied theorem and update step
+
+        self.load_problem(problem)
+        self.open_pool()
 
-        self.problem = Problem()
-        self.problem.load_problem_by_fl(
-            self.parsed_predicate_GDL, self.parsed_theorem_GDL, parse_problem_cdl(problem_CDL))  # load problem
-        EqKiller.solve_equations(self.problem)
-        self.problem.step("init_problem", time.time() - s_start_time)  # save applied theorem and update step
+    def open_pool(self):
+        """
+        Fork <parallel_count> workers for current problem, used by <search_parallel> until <close_pool>.
+        Workers are forked once for each problem, not for each batch.
+        """
+        global _forked_context, _synced_snapshot
+        self.close_pool()
+        if BackwardSearcher.parallel_count <= 1:
+            return
+        if "fork" not in multiprocessing.get_all_start_methods():
+            w_msg = "Parallel backward search needs 'fork' start method, search sequentially."
+            warnings.warn(w_msg)
+            return
+        if self.strategy == "ids":
+            w_msg = "Parallel backward search doesn't support iterative deepening, search sequentially."
+            warnings.warn(w_msg)
+            return
+        _forked_context = self.context  # also inherited by workers re-forked by pool
+        _synced_snapshot = (self.problem.get_snapshot(), len(self.problem.condition.sym_of_attr))
+        self.pool = multiprocessing.get_context("fork").Pool(BackwardSearcher.parallel_count)
+
+    def close_pool(self):
+        """Terminate workers forked by <open_pool>."""
+        global _forked_context
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+            _forked_context = None
+
+    def load_problem(self, problem):
+        """Search on an initialized problem, such as the one shared with forward search."""
+        self.step_size = 0
+        self.finder.reset()
+        self.problem = problem
+        self.rebuild_id_count = 0
+        self.trim_requested = False
+        self.stopped = False
+        self.init_tree(2 if self.strategy == "ids" else self.max_depth)
 
-        self.search_stack = []
-        self.root = SuperNode(None, self.problem, None, 1, self.node_map, self.finder, self.debug, self.search_stack)
+    def init_tree(self, depth_limit):
+        """
+        Build a new search tree with only the root on current problem. Conditions derived by the previous tree
+        are kept in problem and memoized sub goals are kept in finder, so rebuilding only loses the open goals.
+        """
+        self.context = SearchContext(self.problem, self.finder, depth_limit, self.debug)
+        self.root = SuperNode(None, None, 1, self.context)
         if self.problem.goal.type == "algebra":
             eq = self.problem.goal.item - self.problem.goal.answer
             self.root.add_nodes([("Equation", eq)])
         else:
             self.root.add_nodes([(self.problem.goal.item, self.problem.goal.answer)])
 
-        self.search_stack.append(self.root)
+        self.context.delivered_count = self.problem.condition.id_count
+        self.rebuild_step = self.step_size
 
     def search(self):
         """return seqs, <list> of theorem, solved theorem sequences."""
         pid = self.problem.parsed_problem_CDL["id"]
         debug_print(self.debug, "(pid={}) Start Searching".format(pid))
-        if self.strategy == "bfs":
+        if self.pool is not None:
+            self.search_parallel()
+        elif self.strategy == "ids":
+            self.search_iterative_deepening()
+        elif self.strategy in ["bfs", "dfs", "rs"]:
             while self.root.state not in [NodeState.success, NodeState.fail]:
-                self.clean_search_stack()
-                if len(self.search_stack) == 0:
-                    break
-                super_node = self.search_stack.pop(0)
-                self.step_size += 1
-                start_step_count = self.problem.condition.step_count
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Expanding SuperNode Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                super_node.expand()
-
-                debug_print(self.debug,
-                            "(pid={},depth={},branch={}/{}) Expanding SuperNode Done (timing={:.4f})".format(
-                                pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                                time.time() - timing))
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                self.check_node(start_step_count)
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node End (timing={:.4f})".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                    time.time() - timing))
-        elif self.strategy == "dfs":
-            while self.root.state not in [NodeState.success, NodeState.fail]:
-                self.clean_search_stack()
-                if len(self.search_stack) == 0:
+                super_node = self.pop_super_node()
+                if super_node is None or not self.expand_super_node(super_node):
                     break
-                super_node = self.search_stack.pop()
-                self.step_size += 1
-                start_step_count = self.problem.condition.step_count
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Expanding SuperNode Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                super_node.expand()
-
-                debug_print(self.debug,
-                            "(pid={},depth={},branch={}/{}) Expanding SuperNode Done (timing={:.4f})".format(
-                                pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                                time.time() - timing))
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                self.check_node(start_step_count)
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node End (timing={:.4f})".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                    time.time() - timing))
-        elif self.strategy == "rs":
-            while self.root.state not in [NodeState.success, NodeState.fail]:
-                self.clean_search_stack()
-                if len(self.search_stack) == 0:
-                    break
-                super_node = self.search_stack.pop(random.randint(0, len(self.search_stack) - 1))
-                self.step_size += 1
-                start_step_count = self.problem.condition.step_count
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Expanding SuperNode Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                super_node.expand()
-
-                debug_print(self.debug,
-                            "(pid={},depth={},branch={}/{}) Expanding SuperNode Done (timing={:.4f})".format(
-                                pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                                time.time() - timing))
-
-                timing = time.time()
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node Start".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                self.check_node(start_step_count)
-                debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node End (timing={:.4f})".format(
-                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                    time.time() - timing))
         else:
             while self.root.state not in [NodeState.success, NodeState.fail]:
                 self.clean_search_stack()
-                if len(self.search_stack) == 0:
+                if len(self.context.search_stack) == 0:
                     break
-                beam_count = len(self.search_stack)
-                if len(self.search_stack) > self.beam_size:  # select branch with beam size
-                    search_stack = []
-                    for i in random.sample(range(len(self.search_stack)), self.beam_size):
-                        search_stack.append(self.search_stack[i])
-                    self.search_stack = search_stack
+                beam_count = len(self.context.search_stack)
+                if len(self.context.search_stack) > self.beam_size:  # select branch with beam size
+                    search_stack = list(self.context.search_stack)
+                    self.context.search_stack = deque()
+                    for i in random.sample(range(len(search_stack)), self.beam_size):
+                        self.context.search_stack.append(search_stack[i])
                     beam_count = self.beam_size
 
+                context = self.context
+                exhausted = False
                 for i in range(beam_count):
-                    super_node = self.search_stack.pop(0)
+                    if len(context.search_stack) == 0:
+                        break
+                    super_node = context.search_stack.popleft()
                     if super_node.state != NodeState.to_be_expanded:
                         continue
-                    self.step_size += 1
-                    start_step_count = self.problem.condition.step_count
-
-                    timing = time.time()
-                    debug_print(self.debug, "(pid={},depth={},branch={}/{}) Expanding SuperNode Start".format(
-                        pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                    super_node.expand()
-
-                    debug_print(self.debug,
-                                "(pid={},depth={},branch={}/{}) Expanding SuperNode Done (timing={:.4f})".format(
-                                    pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                                    time.time() - timing))
-
-                    timing = time.time()
-                    debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node Start".format(
-                        pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]]))
-                    self.check_node(start_step_count)
-                    debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node End (timing={:.4f})".format(
-                        pid, super_node.pos[0], super_node.pos[1], SuperNode.snc[super_node.pos[0]],
-                        time.time() - timing))
+                    exhausted = not self.expand_super_node(super_node)
+                    if exhausted or self.context is not context:  # search tree may be rebuilt
+                        break
 
                     if self.root.state in [NodeState.success, NodeState.fail]:
                         break
+                if exhausted:
+                    break
 
         self.problem.check_goal()
         # self.save_backward_tree()
@@ -599,45 +826,258 @@ class BackwardSearcher:
         debug_print(self.debug, "(pid={}) End Searching".format(self.problem.parsed_problem_CDL["id"]))
         return False, None
 
-    def clean_search_stack(self):
-        for i in range(len(self.search_stack))[::-1]:
-            if self.search_stack[i].state == NodeState.to_be_expanded:
-                continue
-            self.search_stack.pop(i)
+    def search_iterative_deepening(self):
+        """
+        Iterative deepening DFS. The search tree is limited to <depth_limit>, and rebuilt with <depth_limit> + 1
+        when it is exhausted with some Nodes cut off, until <max_depth>. Conditions derived by shallower
+        iterations are kept in problem, so deeper iterations solve the shared goals at once.
+        Deepening also stops when an iteration reaches no new goals and derives no new conditions, deeper
+        iterations would only expand the same goals on the same facts, the same as DFS ends unsolved.
+        """
+        last_progress = None  # (condition count, goal count) of last iteration
+        while True:
+            while self.root.state not in [NodeState.success, NodeState.fail]:
+                super_node = self.pop_super_node()
+                if super_node is None:
+                    break
+                if not self.expand_super_node(super_node):
+                    return
+
+            if self.root.state in [NodeState.success, NodeState.fail] or not self.context.cutoff or \
+                    self.context.depth_limit >= self.max_depth:
+                return
+            progress = (self.problem.condition.id_count, len(self.context.goal_table))
+            if progress == last_progress:
+                debug_print(self.debug, "(pid={}) No new goals or conditions at depth {}, stop deepening".format(
+                    self.problem.parsed_problem_CDL["id"], self.context.depth_limit))
+                return
+            last_progress = progress
+            debug_print(self.debug, "(pid={}) Deepening to depth {}".format(
+                self.problem.parsed_problem_CDL["id"], self.context.depth_limit + 1))
+            self.init_tree(self.context.depth_limit + 1)
+
+    def pop_super_node(self):
+        """Pop next SuperNode by strategy, return None when search stack is empty. Dead SuperNodes are skipped."""
+        search_stack = self.context.search_stack
+        while len(search_stack) > 0:
+            if self.strategy in ["dfs", "ids"]:
+                super_node = search_stack.pop()
+            elif self.strategy == "rs":
+                i = random.randint(0, len(search_stack) - 1)
+                super_node = search_stack[i]
+                search_stack[i] = search_stack[-1]
+                search_stack.pop()
+            else:
+                super_node = search_stack.popleft()
+            if super_node.state == NodeState.to_be_expanded:
+                return super_node
+        return None
+
+    def expand_super_node(self, super_node):
+        """Expand <super_node> and deliver new conditions, return False when search should stop."""
+        pid = self.problem.parsed_problem_CDL["id"]
+        self.step_size += 1
+
+        timing = time.time()
+        debug_print(self.debug, "(pid={},depth={},branch={}/{}) Expanding SuperNode Start".format(
+            pid, super_node.pos[0], super_node.pos[1], self.context.snc[super_node.pos[0]]))
+        super_node.expand()
 
-    def check_node(self, start_step_count):
-        end_step_count = self.problem.condition.step_count
-        if start_step_count == end_step_count:
+        debug_print(self.debug,
+                    "(pid={},depth={},branch={}/{}) Expanding SuperNode Done (timing={:.4f})".format(
+                        pid, super_node.pos[0], super_node.pos[1], self.context.snc[super_node.pos[0]],
+                        time.time() - timing))
+
+        timing = time.time()
+        debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node Start".format(
+            pid, super_node.pos[0], super_node.pos[1], self.context.snc[super_node.pos[0]]))
+        self.propagate()
+        debug_print(self.debug, "(pid={},depth={},branch={}/{}) Checking Node End (timing={:.4f})".format(
+            pid, super_node.pos[0], super_node.pos[1], self.context.snc[super_node.pos[0]],
+            time.time() - timing))
+
+        return self.bound_frontier()
+
+    def request_trim(self):
+        """Ask search to free memory by <trim> after current expansion, safe to call from other threads."""
+        self.trim_requested = True
+
+    def request_stop(self):
+        """Ask search to stop after current expansion, safe to call from other threads."""
+        self.stopped = True
+
+    def trim(self):
+        """
+        Free memory when the search process is short of it. The search tree is rebuilt from the root, memoized
+        sub goals, equation cache and columnar tables of conditions are cleared. Derived conditions are kept.
+        """
+        self.trim_requested = False
+        debug_print(self.debug, "(pid={}) Trim search tree and caches".format(self.problem.parsed_problem_CDL["id"]))
+        self.rebuild_id_count = self.problem.condition.id_count
+        self.finder.reset()
+        self.init_tree(self.context.depth_limit)
+        if EqKiller.use_cache:
+            EqKiller.cache_eqs = {}
+            EqKiller.cache_target = {}
+        self.problem.condition.clear_tables()
+        gc.collect()  # Node and SuperNode reference each other
+
+    def bound_frontier(self):
+        """
+        Keep the search within <frontier_limit> and <memory_limit>. Extra SuperNodes are dropped from search
+        stack by strategy: dfs keeps the deepest, bfs keeps the shallowest and others keep a random sample.
+        When RSS exceeds <memory_limit>, the search tree is rebuilt from the root and derived conditions are
+        kept. Return False when RSS still exceeds it right after rebuilding, or no condition was derived since
+        last rebuilding (the new tree would repeat the old one), search should stop. Trimming and stopping
+        requested by other threads are handled here too.
+        """
+        if self.stopped:
+            return False
+        if self.trim_requested:
+            self.trim()
+            return True
+
+        if BackwardSearcher.memory_limit is not None and \
+                psutil.Process().memory_info().rss > BackwardSearcher.memory_limit * 1024 * 1024:
+            if self.step_size - self.rebuild_step <= 1 or self.problem.condition.id_count == self.rebuild_id_count:
+                w_msg = "Memory exceeds {}MB and rebuilding search tree doesn't help, stop searching.".format(
+                    BackwardSearcher.memory_limit)
+                warnings.warn(w_msg)
+                return False
+            debug_print(self.debug, "(pid={}) Memory exceeds {}MB, rebuild search tree".format(
+                self.problem.parsed_problem_CDL["id"], BackwardSearcher.memory_limit))
+            self.rebuild_id_count = self.problem.condition.id_count
+            self.init_tree(self.context.depth_limit)
+            gc.collect()  # Node and SuperNode reference each other
+            return True
+
+        limit = BackwardSearcher.frontier_limit
+        if limit is None or len(self.context.search_stack) <= limit:
+            return True
+        self.clean_search_stack()
+        search_stack = list(self.context.search_stack)
+        if len(search_stack) <= limit:
+            return True
+        if self.strategy in ["dfs", "ids"]:
+            search_stack = search_stack[len(search_stack) - limit:]
+        elif self.strategy == "bfs":
+            search_stack = search_stack[:limit]
+        else:
+            search_stack = [search_stack[i] for i in sorted(random.sample(range(len(search_stack)), limit))]
+        self.context.search_stack = deque(search_stack)
+        return True
+
+    def search_parallel(self):
+        """
+        Pop a batch of SuperNodes by strategy and find their sub goals in workers of <open_pool>. Workers are
+        synced to current problem by snapshot (see <Problem.update_by_snapshot>) before each batch and take
+        SuperNodes one by one, so idle workers pick up the remaining ones. Results are merged back into <node_map> and the AND/OR state sequentially in the parent.
+        Sub goals of a batch are all found on the same snapshot, so they may differ slightly from sequential
+        search, where each expansion sees the conditions added by the previous one.
+        When <parallel_deterministic> is True, results are merged in pop order and syms created by workers
+        are aligned in sorted order, so the search result does not depend on process scheduling.
+        Search is kept within bounds by <bound_frontier> before each batch, as in sequential search. Workers are
+        closed when search ends.
+        """
+        try:
+            self.search_batches()
+        finally:
+            self.close_pool()
+
+    def search_batches(self):
+        """Expand SuperNodes batch by batch in workers of <open_pool>, see <search_parallel>."""
+        while self.root.state not in [NodeState.success, NodeState.fail]:
+            if not self.bound_frontier():
+                break
+            self.clean_search_stack()
+            if len(self.context.search_stack) == 0:
+                break
+            if self.strategy not in ["bfs", "dfs", "rs"] and len(self.context.search_stack) > self.beam_size:
+                search_stack = list(self.context.search_stack)
+                self.context.search_stack = deque(search_stack[i] for i in
+                                                  random.sample(range(len(search_stack)), self.beam_size))
+
+            batch = []
+            while len(batch) < BackwardSearcher.parallel_count and len(self.context.search_stack) > 0:
+                super_node = self.pop_super_node()
+                if super_node is None:
+                    break
+                if super_node not in batch:
+                    batch.append(super_node)
+            snapshot = self.problem.get_snapshot()
+            tasks = [(snapshot, [(node.predicate, node.item) for node in super_node.nodes]) for super_node in batch]
+
+            if BackwardSearcher.parallel_deterministic:
+                results = self.pool.map(_find_sub_goals_in_worker, tasks, chunksize=1)
+                new_syms = sorted(set(sym for _, syms in results for sym in syms), key=lambda x: x[0:2])
+                replace = self.problem.align_syms(new_syms)
+                for i in range(len(batch)):
+                    self.merge_sub_goals(batch[i], results[i][0], replace)
+            else:
+                replace = {}
+                for i, (results_of_nodes, syms) in self.pool.imap_unordered(
+                        _enumerate_worker, list(enumerate(tasks))):
+                    replace.update(self.problem.align_syms(syms))
+                    self.merge_sub_goals(batch[i], results_of_nodes, replace)
+
+    def merge_sub_goals(self, super_node, results_of_nodes, replace):
+        """Expand <super_node> with sub goals found by workers and propagate states."""
+        if self.root.state in [NodeState.success, NodeState.fail] or \
+                super_node.state != NodeState.to_be_expanded:
             return
+        if len(replace) > 0:
+            results_of_nodes = [[(t_name, t_branch, t_para,
+                                  tuple((p, i.xreplace(replace) if p == "Equation" else i) for p, i in sub_goals))
+                                 for t_name, t_branch, t_para, sub_goals in results]
+                                for results in results_of_nodes]
+        self.step_size += 1
+        super_node.expand(results_of_nodes)
+        self.propagate()
+
+    def clean_search_stack(self):
+        """Drop SuperNodes that are no longer to be expanded from search stack in one pass."""
+        self.context.search_stack = deque(
+            super_node for super_node in self.context.search_stack if super_node.state == NodeState.to_be_expanded)
 
-        related_pres = []  # new added predicates
-        related_eqs = []  # new added/updated equations
-        for step in range(start_step_count, end_step_count):
-            for _id in self.problem.condition.ids_of_step[step]:
-                if self.problem.condition.items[_id][0] == "Equation":
-                    if self.problem.condition.items[_id][1] in related_eqs:
+    def propagate(self, check_equations=False):
+        """
+        Deliver each new condition once to the Nodes that subscribe to it in <node_map>, logic items by
+        (predicate, item) and equations by the syms connected to them. A subscribed logic Node whose item is
+        now known succeeds at once and propagates up through SuperNode.check_state, other Nodes are expanded
+        again with the new conditions. Conditions added during delivery are delivered in the next round.
+        :param check_equations: <bool>, also solve subscribed algebra Nodes before expanding them, used when
+        many conditions come from outside, such as forward search.
+        """
+        condition = self.problem.condition
+        while self.context.delivered_count < condition.id_count:
+            start, end = self.context.delivered_count, condition.id_count
+            self.context.delivered_count = end
+
+            related = []  # (predicate, item) or sym, in delivery order
+            related_eqs = set()  # new added/updated equations
+            new_eq_ids = set()
+            for _id in range(start, end):
+                predicate, item = condition.items[_id][0:2]
+                if predicate == "Equation":
+                    related_eqs.add(item)
+                    new_eq_ids.add(_id)
+                elif (predicate, item) in self.context.node_map:
+                    related.append((predicate, item))
+            if len(new_eq_ids) > 0:
+                for simp_eq in condition.simplified_equation:  # one pass for all new equations
+                    if not new_eq_ids.isdisjoint(condition.simplified_equation[simp_eq]):
+                        related_eqs.add(simp_eq)
+                for sym in EqKiller.get_minimum_syms(list(related_eqs), list(condition.simplified_equation)):
+                    if sym in self.context.node_map:
+                        related.append(sym)
+
+            delivered = set()  # id of Node, each Node is delivered once per round
+            for key in related:
+                for node in self.context.node_map[key]:
+                    if node.state in [NodeState.fail, NodeState.success] or id(node) in delivered:
                         continue
-                    related_eqs.append(self.problem.condition.items[_id][1])
-                    for simp_eq in self.problem.condition.simplified_equation:
-                        if simp_eq in related_eqs:
-                            continue
-                        if _id not in self.problem.condition.simplified_equation[simp_eq]:
-                            continue
-                        related_eqs.append(simp_eq)
-                else:
-                    predicate, item = self.problem.condition.items[_id][0:2]
-                    if (predicate, item) not in self.node_map or (predicate, item) in related_pres:
+                    delivered.add(id(node))
+                    if (node.predicate != "Equation" or check_equations) and node.check_goal():
+                        node.super_node.check_state()
                         continue
-                    related_pres.append((predicate, item))
-        for sym in EqKiller.get_minimum_syms(related_eqs, list(self.problem.condition.simplified_equation)):
-            if sym not in self.node_map:
-                continue
-            related_pres.append(sym)
-
-        for related in related_pres:
-            for node in self.node_map[related]:
-                if node.state in [NodeState.fail, NodeState.success]:
-                    continue
-                node.expand(self.search_stack)
-
-        self.check_node(end_step_count)
+                    node.expand()
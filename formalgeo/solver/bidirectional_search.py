@@ -0,0 +1,124 @@
+import time
+from formalgeo.solver.forward_search import ForwardSearcher
+from formalgeo.solver.backward_search import BackwardSearcher, NodeState
+from formalgeo.tools import get_used_pid_and_theorem, debug_print
+
+
+class BidirectionalSearcher:
+    forward_steps = 16  # <int>, forward selections applied in each round
+    backward_steps = 1  # <int>, backward SuperNodes expanded in each round
+
+    def __init__(self, predicate_GDL, theorem_GDL, strategy, max_depth, beam_size, t_info, debug=False,
+                 gdl_cache_path=None, snapshot_path=None):
+        """
+        Initialize Bidirectional Searcher. Forward search saturates the problem with a few steps in each round,
+        and backward search decomposes the goal on the same problem. Facts derived by one direction are seen by
+        the other, and search stops once all open backward goals are covered by known facts.
+        :param predicate_GDL: predicate GDL.
+        :param theorem_GDL: theorem GDL.
+        :param strategy: <str>, "dfs", "bfs", "rs", "bs", "bestfirst" or "ids", direction that doesn't
+        support it uses "bfs".
+        :param max_depth: max search depth of both directions.
+        :param beam_size: beam search size.
+        :param t_info: <dict>, {t_name: (category_id, usage_count)}, user customization.
+        :param debug: <bool>, set True when need print process information.
+        :param gdl_cache_path: <str>, path of parsed GDL cache, see <formalgeo.parse.parse_gdl>.
+        :param snapshot_path: <str>, path of initialized problem snapshots, see <formalgeo.problem.init_problem>.
+        """
+        self.forward = ForwardSearcher(
+            predicate_GDL, theorem_GDL, "bfs" if strategy == "ids" else strategy,
+            max_depth, beam_size, t_info, debug, gdl_cache_path, snapshot_path)
+        self.backward = BackwardSearcher(
+            predicate_GDL, theorem_GDL, "bfs" if strategy == "bestfirst" else strategy,
+            max_depth, beam_size, t_info, debug, gdl_cache_path)
+        self.strategy = strategy
+        self.debug = debug
+
+        self.problem = None
+        self.step_size = None
+
+    def init_search(self, problem_CDL):
+        """Init problem by forward search and build backward search tree on it."""
+        self.forward.init_search(problem_CDL)
+        self.problem = self.forward.problem
+        self.backward.load_problem(self.problem)
+        self.step_size = 0
+
+    def search(self):
+        """
+        Search problem and return search result.
+        :return solved: <bool>, indicate whether problem solved or not.
+        :return seqs: <list> of <str>, solved theorem sequences.
+        """
+        pid = self.problem.parsed_problem_CDL["id"]
+        debug_print(self.debug, "(pid={}) Start Bidirectional Searching".format(pid))
+        while not self.problem.goal.solved and self.backward.root.state != NodeState.success:
+            timing = time.time()
+            backward_alive = self.search_backward()
+            debug_print(self.debug, "(pid={},step={}) Backward Done (timing={:.4f})".format(
+                pid, self.step_size, time.time() - timing))
+            if self.backward.root.state == NodeState.success:
+                break
+
+            timing = time.time()
+            forward_alive = self.search_forward()
+            if self.problem.goal.solved:
+                break
+            self.backward.propagate(check_equations=True)  # meet, open goals covered by forward facts succeed
+            debug_print(self.debug, "(pid={},step={}) Forward Done (timing={:.4f})".format(
+                pid, self.step_size, time.time() - timing))
+
+            if not forward_alive and not backward_alive:
+                break
+
+        self.forward.close_pool()
+        self.problem.check_goal()
+        debug_print(self.debug, "(pid={}) End Bidirectional Searching".format(pid))
+        if self.problem.goal.solved:
+            _, seqs = get_used_pid_and_theorem(self.problem)
+            return True, seqs
+        return False, None
+
+    @property
+    def trim_requested(self):
+        return self.forward.trim_requested or self.backward.trim_requested
+
+    def request_trim(self):
+        """Ask both directions to free memory before their next step, safe to call from other threads."""
+        self.forward.request_trim()
+        self.backward.request_trim()
+
+    def request_stop(self):
+        """Ask both directions to stop before their next step, safe to call from other threads."""
+        self.forward.request_stop()
+        self.backward.request_stop()
+
+    def search_forward(self):
+        """Apply at most <forward_steps> forward selections, return False when forward frontier is empty."""
+        for i in range(BidirectionalSearcher.forward_steps):
+            if len(self.forward.stack) == 0:
+                return False
+            self.step_size += 1
+            if self.forward.step():
+                break
+        return len(self.forward.stack) > 0
+
+    def search_backward(self):
+        """Expand at most <backward_steps> backward SuperNodes, return False when backward frontier is empty."""
+        backward = self.backward
+        for i in range(BidirectionalSearcher.backward_steps):
+            if backward.root.state == NodeState.success:
+                return True
+            if backward.root.state == NodeState.fail:
+                return False
+            super_node = backward.pop_super_node()
+            if super_node is None and backward.strategy == "ids" and backward.context.cutoff and \
+                    backward.context.depth_limit < backward.max_depth:
+                backward.init_tree(backward.context.depth_limit + 1)
+                super_node = backward.pop_super_node()
+            if super_node is None:
+                return False
+            self.step_size += 1
+            if not backward.expand_super_node(super_node):
+                return False
+        return True
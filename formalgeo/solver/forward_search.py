@@ -1,9 +1,15 @@
+import gc
 import time
+import heapq
 import random
-from formalgeo.problem import Problem
+import warnings
+import multiprocessing
+from collections import deque
+from formalgeo.problem import init_problem, get_snapshot_filename
 from formalgeo.core import GeometryPredicateLogicExecutor as GPLExecutor
 from formalgeo.core import EquationKiller as EqKiller
-from formalgeo.parse import parse_predicate_gdl, parse_theorem_gdl, parse_problem_cdl
+from formalgeo.parse import parse_gdl, parse_problem_cdl
+from formalgeo.parse.parse_gdl import get_gdl_hash
 from formalgeo.tools import get_used_pid_and_theorem, debug_print
 
 
@@ -32,36 +38,79 @@ def get_p2t_map_fw(t_info, parsed_theorem_GDL):
     return p2t_map_fw
 
 
+_forked_searcher = None  # searcher inherited by forked workers, see <ForwardSearcher.open_pool>
+
+
+def _run_theorems_in_worker(task):
+    """Sync forked problem to the snapshot, run theorems and return selections and newly created syms."""
+    snapshot, related_pres = task
+    _forked_searcher.problem.update_by_snapshot(snapshot)
+    sym_of_attr = _forked_searcher.problem.condition.sym_of_attr
+    sym_count = len(sym_of_attr)
+    selections = _forked_searcher.run_theorems(related_pres)
+    new_syms = [(attr, item, sym_of_attr[(attr, item)]) for attr, item in list(sym_of_attr)[sym_count:]]
+    return selections, new_syms
+
+
 class ForwardSearcher:
+    parallel_count = 0  # <int>, process count used to run related theorems, 0 means run sequentially
+    parallel_threshold = 32  # <int>, run in parallel only when related theorems more than this
 
-    def __init__(self, predicate_GDL, theorem_GDL, strategy, max_depth, beam_size, t_info, debug=False):
+    def __init__(self, predicate_GDL, theorem_GDL, strategy, max_depth, beam_size, t_info, debug=False,
+                 gdl_cache_path=None, snapshot_path=None):
         """
         Initialize Forward Searcher.
         :param predicate_GDL: predicate GDL.
         :param theorem_GDL: theorem GDL.
-        :param strategy: <str>, "dfs", "bfs", "rs", "bs".
+        :param strategy: <str>, "dfs", "bfs", "rs", "bs", "bestfirst".
         :param max_depth: max search depth.
         :param beam_size: beam search size.
         :param t_info: <dict>, {t_name: (category_id, usage_count)}, user customization.
         :param debug: <bool>, set True when need print process information.
+        :param gdl_cache_path: <str>, path of parsed GDL cache, see <formalgeo.parse.parse_gdl>.
+        :param snapshot_path: <str>, path of initialized problem snapshots, see <formalgeo.problem.init_problem>.
         """
-        self.parsed_predicate_GDL = parse_predicate_gdl(predicate_GDL)
-        self.parsed_theorem_GDL = parse_theorem_gdl(theorem_GDL, self.parsed_predicate_GDL)
+        self.parsed_predicate_GDL, self.parsed_theorem_GDL = parse_gdl(
+            predicate_GDL, theorem_GDL, gdl_cache_path)
+        self.snapshot_path = snapshot_path
+        self.gdl_hash = None if snapshot_path is None else get_gdl_hash(predicate_GDL, theorem_GDL)
         self.max_depth = max_depth
         self.beam_size = beam_size
+        if strategy not in ("bfs", "dfs", "rs", "bs", "bestfirst"):
+            e_msg = "Unknown forward search strategy '{}'.".format(strategy)
+            raise Exception(e_msg)
         self.strategy = strategy
         self.debug = debug
         self.p2t_map = get_p2t_map_fw(t_info, self.parsed_theorem_GDL)
 
+        max_usage = max([t_info[t_name][1] for t_name in t_info] + [1])
+        self.t_usage = {t_name: t_info[t_name][1] / max_usage for t_name in t_info}  # used by best-first
+
+        self.pool = None  # <Pool> of forked workers of current problem, see <open_pool>
         self.problem = None
-        self.stack = None
-        self.last_step = None
+        self.stack = None  # frontier, <deque> for bfs and bs, <list> as stack/bag/heap for dfs/rs/bestfirst
+        self.queued = None  # <set> of conclusion keys already queued, avoid expanding the same conclusions twice
+        self.last_id = None  # <int>, id of the first condition added by current selection
+        self.applied_count = None  # <int>, condition count after last applied selection
+        self.external_ids = None  # <list> of ids of conditions added by others, such as bidirectional search
         self.step_size = None
         self.node_count = None  # {depth: node_count}
 
         self.problem_p_paras = None  # Perimeter
         self.problem_a_paras = None  # Area
 
+        self.goal_syms = None  # syms related to goal, used by best-first
+        self.goal_points = None  # points of goal, used by best-first
+
+        self.trim_requested = False  # <bool>, set by <request_trim> from other threads, handled in search thread
+        self.stopped = False  # <bool>, set by <request_stop> from other threads, search stops at next step
+
+    def get_snapshot_filename(self, problem_CDL):
+        """Snapshot file of problem, None when not using snapshots."""
+        if self.snapshot_path is None:
+            return None
+        return get_snapshot_filename(self.snapshot_path, problem_CDL["problem_id"], self.gdl_hash)
+
     def init_search(self, problem_CDL):
         """Initial problem by problem_CDL and build root Node."""
         EqKiller.use_cache = True  # use cache to speed up solving
@@ -70,16 +119,20 @@ class ForwardSearcher:
 
         timing = time.time()  # timing
 
-        self.problem = Problem()  # init problem
-        self.problem.load_problem_by_fl(
-            self.parsed_predicate_GDL, self.parsed_theorem_GDL, parse_problem_cdl(problem_CDL))
-        EqKiller.solve_equations(self.problem)
+        self.problem = init_problem(  # init problem
+            self.parsed_predicate_GDL, self.parsed_theorem_GDL, parse_problem_cdl(problem_CDL),
+            self.get_snapshot_filename(problem_CDL))
         self.problem.step("init_problem", 0)
 
-        self.stack = []
-        self.last_step = 0
+        self.stack = deque() if self.strategy in ["bfs", "bs"] else []
+        self.queued = set()
+        self.last_id = 0
+        self.applied_count = self.problem.condition.id_count
+        self.external_ids = []
         self.step_size = 0
         self.node_count = {1: 1}
+        self.trim_requested = False
+        self.stopped = False
 
         self.problem_p_paras = set()  # Perimeter
         self.problem_a_paras = set()  # Area
@@ -93,9 +146,21 @@ class ForwardSearcher:
                 for para in paras:
                     self.problem_a_paras.add(para)
             """
+        self.goal_syms = set()
+        self.goal_points = set()
+        if self.problem.goal.type == "logic":
+            self.goal_points = set(self.problem.goal.answer)
+        elif self.problem.goal.item is not None:
+            for sym in self.problem.goal.item.free_symbols:
+                if sym not in self.problem.condition.attr_of_sym:
+                    continue
+                for para in self.problem.condition.attr_of_sym[sym][1]:
+                    self.goal_points |= set(para)
+
         debug_print(self.debug, "(pid={}, strategy={}, timing={:.4f}s) Initialize and start forward search...".format(
             problem_CDL["problem_id"], self.strategy, time.time() - timing))
 
+        self.open_pool()
         timing = time.time()
         selections = self.get_theorem_selection()
         self.add_selections([], selections)
@@ -104,14 +169,20 @@ class ForwardSearcher:
 
     def search(self):
         """
-        Search problem and return search result.
+        Search problem and return search result. Workers of <open_pool> are closed when search ends.
         :return solved: <bool>, indicate whether problem solved or not.
         :return seqs: <list> of <str>, solved theorem sequences.
         """
+        try:
+            return self.search_by_strategy()
+        finally:
+            self.close_pool()
+
+    def search_by_strategy(self):
+        """Search problem by <strategy>, see <search>."""
         if self.strategy == "bfs":  # breadth-first search
             while len(self.stack) > 0:
-                pos, selection = self.stack.pop(0)
-                #print(pos,selection)
+                pos, selection = self.stack.popleft()
                 self.step_size += 1
                 debug_print(self.debug, "\n(pos={}, node_count={}) Current node.".format(pos, self.node_count))
                 timing = time.time()
@@ -155,7 +226,9 @@ class ForwardSearcher:
                                 format(time.time() - timing, len(selections)))
         elif self.strategy == "rs":  # random search
             while len(self.stack) > 0:
-                pos, selection = self.stack.pop(random.randint(0, len(self.stack) - 1))
+                i = random.randint(0, len(self.stack) - 1)  # swap with last and pop, O(1) random removal
+                self.stack[i], self.stack[-1] = self.stack[-1], self.stack[i]
+                pos, selection = self.stack.pop()
                 self.step_size += 1
                 debug_print(self.debug, "\n(pos={}, node_count={}) Current node.".format(pos, self.node_count))
                 timing = time.time()
@@ -175,18 +248,42 @@ class ForwardSearcher:
                     self.add_selections(pos, selections)
                     debug_print(self.debug, "(timing={:.4f}s) Expand {} child node.".
                                 format(time.time() - timing, len(selections)))
+        elif self.strategy == "bestfirst":  # best-first search, expand the most goal-relevant node first
+            while len(self.stack) > 0:
+                _, pos, selection = heapq.heappop(self.stack)
+                self.step_size += 1
+                debug_print(self.debug, "\n(pos={}, node_count={}) Current node.".format(pos, self.node_count))
+                timing = time.time()
+                solved = self.apply_and_check_goal(selection)
+                debug_print(self.debug, "(solved={}, timing={:.4f}s) Apply selection and check goal.".format(
+                    solved, time.time() - timing))
+                if solved is None:  # not update, close search branch
+                    continue
+                if solved:  # solved, return result
+                    debug_print(self.debug, "(step_size={}) Solved by best-first search.".format(self.step_size))
+                    _, seqs = get_used_pid_and_theorem(self.problem)
+                    return True, seqs
+                else:  # continue search
+                    if len(pos) == self.max_depth:
+                        continue
+                    timing = time.time()
+                    selections = self.get_theorem_selection()
+                    self.add_selections(pos, selections)
+                    debug_print(self.debug, "(timing={:.4f}s) Expand {} child node.".
+                                format(time.time() - timing, len(selections)))
         else:  # beam search
             while len(self.stack) > 0:
                 beam_count = len(self.stack)
                 if len(self.stack) > self.beam_size:  # select branch with beam size
-                    stack = []
-                    for i in random.sample(range(len(self.stack)), self.beam_size):
-                        stack.append(self.stack[i])
-                    self.stack = stack
+                    frontier = list(self.stack)
+                    self.stack = deque(frontier[i] for i in random.sample(range(len(frontier)), self.beam_size))
+                    self.queued = set(self.get_selection_key(selection) for _, selection in self.stack)
                     beam_count = self.beam_size
 
                 for i in range(beam_count):
-                    pos, selection = self.stack.pop(0)
+                    if len(self.stack) == 0:  # frontier may be trimmed
+                        break
+                    pos, selection = self.stack.popleft()
                     self.step_size += 1
                     debug_print(self.debug, "\n(pos={}, node_count={}) Current node.".format(pos, self.node_count))
                     timing = time.time()
@@ -209,9 +306,42 @@ class ForwardSearcher:
 
         return False, None
 
+    def step(self):
+        """
+        Pop one selection by strategy, apply it and expand its children, used by bidirectional search.
+        Beam search pops in breadth-first order and keeps <beam_size> selections in frontier.
+        :return solved: <bool> or None. Set None when not update or frontier is empty.
+        """
+        if len(self.stack) == 0:
+            return None
+        if self.strategy == "bfs":
+            pos, selection = self.stack.popleft()
+        elif self.strategy == "dfs":
+            pos, selection = self.stack.pop()
+        elif self.strategy == "rs":
+            i = random.randint(0, len(self.stack) - 1)
+            self.stack[i], self.stack[-1] = self.stack[-1], self.stack[i]
+            pos, selection = self.stack.pop()
+        elif self.strategy == "bestfirst":
+            _, pos, selection = heapq.heappop(self.stack)
+        else:
+            if len(self.stack) > self.beam_size:
+                frontier = list(self.stack)
+                self.stack = deque(frontier[i] for i in random.sample(range(len(frontier)), self.beam_size))
+                self.queued = set(self.get_selection_key(selection) for _, selection in self.stack)
+            pos, selection = self.stack.popleft()
+        self.step_size += 1
+
+        solved = self.apply_and_check_goal(selection)
+        if solved is None or solved or len(pos) == self.max_depth:
+            return solved
+        self.add_selections(pos, self.get_theorem_selection())
+        return solved
+
     def get_theorem_selection(self):
         """
-        Return theorem selections according to <self.last_step>.
+        Return theorem selections related to conditions added by current selection and by others since last
+        selections, see <apply_and_check_goal>.
         :return selections: <list> of ((t_name, t_branch, t_para), ((predicate, item, premise))).
         """
         selections = []
@@ -219,26 +349,30 @@ class ForwardSearcher:
         timing = time.time()
         related_pres = []  # new added predicates
         related_syms = []  # new added/updated equations
-        for step in range(self.last_step, self.problem.condition.step_count):  # get related conditions
-            for _id in self.problem.condition.ids_of_step[step]:
-                if self.problem.condition.items[_id][0] == "Equation":
-                    for sym in self.problem.condition.items[_id][1].free_symbols:
-                        if sym in related_syms:
-                            continue
-                        related_syms.append(sym)
-                else:
-                    if self.problem.condition.items[_id][0] not in self.p2t_map:
+        related_keys = set()  # hashed keys of related_pres and related_syms, used for deduplication
+        related_ids = self.external_ids + list(range(self.last_id, self.problem.condition.id_count))
+        self.external_ids = []
+        for _id in related_ids:  # get related conditions
+            if self.problem.condition.items[_id][0] == "Equation":
+                for sym in self.problem.condition.items[_id][1].free_symbols:
+                    if sym in related_keys:
                         continue
-                    item = self.problem.condition.items[_id][1]
-                    for t_name, t_branch, p_vars in self.p2t_map[self.problem.condition.items[_id][0]]:
-                        if len(p_vars) != len(item):
-                            continue
-                        letters = {}
-                        for i in range(len(p_vars)):
-                            letters[p_vars[i]] = item[i]
-                        related_pre = (t_name, t_branch, letters)
-                        if related_pre not in related_pres:
-                            related_pres.append(related_pre)
+                    related_keys.add(sym)
+                    related_syms.append(sym)
+            else:
+                if self.problem.condition.items[_id][0] not in self.p2t_map:
+                    continue
+                item = self.problem.condition.items[_id][1]
+                for t_name, t_branch, p_vars in self.p2t_map[self.problem.condition.items[_id][0]]:
+                    if len(p_vars) != len(item):
+                        continue
+                    letters = {}
+                    for i in range(len(p_vars)):
+                        letters[p_vars[i]] = item[i]
+                    related_key = (t_name, t_branch, tuple(sorted(letters.items())))
+                    if related_key not in related_keys:
+                        related_keys.add(related_key)
+                        related_pres.append((t_name, t_branch, letters))
         debug_print(self.debug, "(timing={:.4f}s) Get Related.".format(time.time() - timing))
         debug_print(self.debug, "Related predicates: {}.".format(related_pres))
         debug_print(self.debug, "Related syms: {}.".format(related_syms))
@@ -253,16 +387,10 @@ class ForwardSearcher:
             time.time() - timing, len(algebra_selections), algebra_selections))
 
         timing = time.time()
-        added_selections = []
         for selection in logic_selections + algebra_selections:  # remove redundancy
-            _, conclusions = selection
-            s = []
-            for conclusion in conclusions:
-                predicate, item, _ = conclusion
-                s.append((predicate, item))
-            s = tuple(s)
-            if s not in added_selections:
-                added_selections.append(s)
+            s = self.get_selection_key(selection)
+            if s not in self.queued:  # also skip conclusions already queued by other branches
+                self.queued.add(s)
                 selections.append(selection)
 
         for i in range(len(selections))[::-1]:
@@ -293,13 +421,60 @@ class ForwardSearcher:
 
         return selections
 
+    @staticmethod
+    def get_selection_key(selection):
+        """
+        Canonical key of selection, selections with the same conclusions have the same key.
+        :param selection: ((t_name, t_branch, t_para), ((predicate, item, premise))).
+        :return key: <tuple> of (predicate, item).
+        """
+        return tuple((predicate, item) for predicate, item, _ in selection[1])
+
     def try_theorem_logic(self, related_pres):
         """
         Try a theorem and return can-added conclusions.
         :param related_pres: <list>, list of tuple('t_name', 't_branch', letters).
         :return selections: <list> of ((t_name, t_branch, t_para, t_timing), ((predicate, item, premise))).
         """
+        if self.pool is not None and len(related_pres) > ForwardSearcher.parallel_threshold:
+            return self.run_theorems_parallel(related_pres)
+        return self.run_theorems(related_pres)
+
+    def try_theorem_algebra(self, related_syms):
+        """
+        Try a theorem and return can-added conclusions.
+        :param related_syms: <list>, related syms.
+        :return selections: <list> of ((t_name, t_branch, t_para, t_timing), ((predicate, item, premise))).
+        """
+        paras_of_attrs = {}  # <dict>, {attr: {para}}
+        for sym in related_syms:
+            attr, paras = self.problem.condition.attr_of_sym[sym]
+            if attr not in self.p2t_map:
+                continue
+
+            if attr not in paras_of_attrs:
+                paras_of_attrs[attr] = set()
+
+            paras_of_attrs[attr].update(paras)
+
+        related_pres = []
+        for related_attr in paras_of_attrs:
+            related_paras = paras_of_attrs[related_attr]
+            for t_name, t_branch, p_vars in self.p2t_map[related_attr]:
+                for related_para in related_paras:
+                    letters = {}
+                    for i in range(len(p_vars)):
+                        letters[p_vars[i]] = related_para[i]
+                    related_pres.append((t_name, t_branch, letters))
 
+        return self.try_theorem_logic(related_pres)
+
+    def run_theorems(self, related_pres):
+        """
+        Run theorems with preset letters one by one and return can-added conclusions.
+        :param related_pres: <list>, list of tuple('t_name', 't_branch', letters).
+        :return selections: <list> of ((t_name, t_branch, t_para), ((predicate, item, premise))).
+        """
         selections = []
         for t_name, t_branch, t_letters in related_pres:
             gpl = self.parsed_theorem_GDL[t_name]["body"][t_branch]
@@ -310,7 +485,8 @@ class ForwardSearcher:
                 premise = tuple(premise)
                 conclusions = []
                 for predicate, item in conclusion:  # add conclusion
-                    if self.problem.check(predicate, item, premise, t_name):
+                    checked, predicate = self.problem.check(predicate, item, premise, t_name)
+                    if checked:
                         if predicate != "Equation":
                             item = tuple(item)
                         conclusions.append((predicate, item, premise))
@@ -320,69 +496,120 @@ class ForwardSearcher:
 
         return selections
 
-    def try_theorem_algebra(self, related_syms):
+    def open_pool(self):
         """
-        Try a theorem and return can-added conclusions.
-        :param related_syms: <list>, related syms.
-        :return selections: <list> of ((t_name, t_branch, t_para, t_timing), ((predicate, item, premise))).
+        Fork <parallel_count> workers for current problem, used by <run_theorems_parallel> until <close_pool>.
+        Workers are forked once for each problem, not for each run.
         """
-        paras_of_attrs = {}  # <dict>, {attr: [para]}
-        for sym in related_syms:
-            attr, paras = self.problem.condition.attr_of_sym[sym]
-            if attr not in self.p2t_map:
-                continue
+        global _forked_searcher
+        self.close_pool()
+        if ForwardSearcher.parallel_count <= 1:
+            return
+        if "fork" not in multiprocessing.get_all_start_methods():
+            w_msg = "Parallel theorem running needs 'fork' start method, run sequentially."
+            warnings.warn(w_msg)
+            return
+        _forked_searcher = self  # also inherited by workers re-forked by pool
+        self.pool = multiprocessing.get_context("fork").Pool(ForwardSearcher.parallel_count)
+
+    def close_pool(self):
+        """Terminate workers forked by <open_pool>."""
+        global _forked_searcher
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+            _forked_searcher = None
+
+    def run_theorems_parallel(self, related_pres):
+        """
+        Split related theorems into contiguous chunks and run them in workers of <open_pool>.
+        Workers are synced to current problem by snapshot (see <Problem.update_by_snapshot>) before each run.
+        Selections are merged in chunk order, the same order as <run_theorems>. Syms created by workers are
+        created again in current problem in sorted order (see <Problem.align_syms>), and equations of workers
+        are rewritten with the syms of current problem.
+        :param related_pres: <list>, list of tuple('t_name', 't_branch', letters).
+        :return selections: <list> of ((t_name, t_branch, t_para), ((predicate, item, premise))).
+        """
+        chunk_size = int((len(related_pres) + ForwardSearcher.parallel_count - 1) / ForwardSearcher.parallel_count)
+        chunks = [related_pres[i:i + chunk_size] for i in range(0, len(related_pres), chunk_size)]
 
-            if attr not in paras_of_attrs:
-                paras_of_attrs[attr] = []
+        snapshot = self.problem.get_snapshot()
+        results = self.pool.map(_run_theorems_in_worker, [(snapshot, chunk) for chunk in chunks], chunksize=1)
 
-            for para in paras:
-                if para in paras_of_attrs[attr]:
-                    continue
-                paras_of_attrs[attr].append(para)
+        new_syms = sorted(set(sym for _, chunk_syms in results for sym in chunk_syms), key=lambda x: x[0:2])
+        replace = self.problem.align_syms(new_syms)  # {sym of worker: sym of current problem}
 
         selections = []
-        for related_attr in paras_of_attrs:
-            related_paras = set(paras_of_attrs[related_attr])
-            for t_name, t_branch, p_vars in self.p2t_map[related_attr]:
-                gpl = self.parsed_theorem_GDL[t_name]["body"][t_branch]  # run gdl
-                for related_para in related_paras:
-                    letters = {}
-                    for i in range(len(p_vars)):
-                        letters[p_vars[i]] = related_para[i]
-                    results = GPLExecutor.run(gpl, self.problem, letters)  # get gpl reasoned result
-                    for letters, premise, conclusion in results:
-                        theorem_para = tuple([letters[i] for i in self.parsed_theorem_GDL[t_name]["vars"]])
-                        premise = tuple(premise)
-                        conclusions = []
-                        for predicate, item in conclusion:  # add conclusion
-                            if self.problem.check(predicate, item, premise, t_name):
-                                if predicate != "Equation":
-                                    item = tuple(item)
-                                conclusions.append((predicate, item, premise))
-
-                        if len(conclusions) > 0:
-                            selections.append(((t_name, t_branch, theorem_para), tuple(conclusions)))
+        for chunk_selections, _ in results:
+            if len(replace) == 0:
+                selections += chunk_selections
+                continue
+            for t_msg, conclusions in chunk_selections:
+                conclusions = tuple((predicate, item.xreplace(replace) if predicate == "Equation" else item, premise)
+                                    for predicate, item, premise in conclusions)
+                selections.append((t_msg, conclusions))
+
         return selections
 
+    def request_trim(self):
+        """Ask search to free memory by <trim> before next step, safe to call from other threads."""
+        self.trim_requested = True
+
+    def request_stop(self):
+        """Ask search to stop before next step and return unsolved, safe to call from other threads."""
+        self.stopped = True
+
+    def trim(self):
+        """
+        Free memory when the search process is short of it. Half of the frontier is dropped by strategy: bfs and
+        bs keep the head, dfs keeps the tail, best-first keeps the best and rs keeps a random sample. Equation
+        cache and columnar tables of conditions are cleared.
+        """
+        self.trim_requested = False
+        keep = len(self.stack) // 2
+        if self.strategy in ["bfs", "bs"]:
+            self.stack = deque(list(self.stack)[:keep])
+        elif self.strategy == "dfs":
+            self.stack = self.stack[len(self.stack) - keep:]
+        elif self.strategy == "bestfirst":
+            self.stack = heapq.nsmallest(keep, self.stack)  # sorted list is a heap
+        else:
+            self.stack = [self.stack[i] for i in sorted(random.sample(range(len(self.stack)), keep))]
+        self.queued = set(self.get_selection_key(item[-1]) for item in self.stack)
+
+        if EqKiller.use_cache:
+            EqKiller.cache_eqs = {}
+            EqKiller.cache_target = {}
+        self.problem.condition.clear_tables()
+        gc.collect()
+
     def apply_and_check_goal(self, selection):
         """
-        Apply selection and check goal.
+        Apply selection and check goal. Conditions added by others since last applied selection, such as by
+        backward half of bidirectional search, are kept in <external_ids> until next <get_theorem_selection>.
         :param selection: ((t_name, t_branch, t_para), ((predicate, item, premise))).
         :return solved: <bool> or None. Set None when not update
         """
-        self.last_step = self.problem.condition.step_count
-        update = False
+        if self.trim_requested:
+            self.trim()
+        if self.stopped:  # drop frontier so that search ends
+            self.stack.clear()
+            return None
+        self.external_ids += range(self.applied_count, self.problem.condition.id_count)
+        self.last_id = self.problem.condition.id_count
         t_msg, conclusions = selection
 
-        for predicate, item, premise in conclusions:
-            update = self.problem.add(predicate, item, premise, t_msg, skip_check=True) or update
+        added = self.problem.add_batch(
+            [(predicate, item, premise, t_msg) for predicate, item, premise in conclusions], skip_check=True)
 
-        if not update:  # close current branch if applied theorem no new condition
+        if not any(added):  # close current branch if applied theorem no new condition
+            self.applied_count = self.problem.condition.id_count
             return None
 
         EqKiller.solve_equations(self.problem)  # solve eq & check_goal
         self.problem.check_goal()
         self.problem.step(t_msg, 0)
+        self.applied_count = self.problem.condition.id_count
 
         return self.problem.goal.solved
 
@@ -397,6 +624,36 @@ class ForwardSearcher:
         if depth not in self.node_count:
             self.node_count[depth] = 1
 
+        if self.strategy == "bestfirst":
+            if self.problem.goal.type == "algebra" and self.problem.goal.item is not None:
+                self.goal_syms = EqKiller.get_minimum_syms(
+                    [self.problem.goal.item], list(self.problem.condition.simplified_equation))
+            for selection in selections:
+                priority = depth - self.get_relevance(selection)  # f = g + h, h is negative relevance
+                heapq.heappush(self.stack, (priority, tuple(pos + [self.node_count[depth]]), selection))
+                self.node_count[depth] += 1
+            return
+
         for selection in selections:
             self.stack.append((tuple(pos + [self.node_count[depth]]), selection))
             self.node_count[depth] += 1
+
+    def get_relevance(self, selection):
+        """
+        Heuristic relevance between selection and goal, used by best-first search.
+        Sum of goal-related syms in conclusions, the ratio of goal points in theorem para and the
+        normalized theorem usage count from t_info.
+        :param selection: ((t_name, t_branch, t_para), ((predicate, item, premise))).
+        :return relevance: <float>, bigger means more relevant.
+        """
+        (t_name, _, t_para), conclusions = selection
+        relevance = self.t_usage.get(t_name, 0)
+
+        for predicate, item, _ in conclusions:
+            if predicate == "Equation":
+                relevance += len(item.free_symbols & self.goal_syms)
+
+        if len(t_para) > 0:
+            relevance += len([p for p in t_para if p in self.goal_points]) / len(t_para)
+
+        return relevance
@@ -1,7 +1,7 @@
 from formalgeo.problem import Problem
 from formalgeo.core import GeometryPredicateLogicExecutor as GPLExecutor
 from formalgeo.core import EquationKiller as EqKiller
-from formalgeo.parse import parse_predicate_gdl, parse_theorem_gdl, parse_problem_cdl
+from formalgeo.parse import parse_gdl, parse_problem_cdl
 from formalgeo.parse import get_equation_from_tree
 from formalgeo.tools import rough_equal
 import warnings
@@ -10,15 +10,14 @@ import time
 
 class Interactor:
 
-    def __init__(self, predicate_GDL, theorem_GDL):
+    def __init__(self, predicate_GDL, theorem_GDL, gdl_cache_path=None):
         """
         Initialize Interactor.
         :param predicate_GDL: predicate GDL.
         :param theorem_GDL: theorem GDL.
+        :param gdl_cache_path: <str>, path of parsed GDL cache, see <formalgeo.parse.parse_gdl>.
         """
-        self.parsed_predicate_GDL = parse_predicate_gdl(predicate_GDL)
-        #print(f"Parsed predicate GDL: {self.parsed_predicate_GDL}")
-        self.parsed_theorem_GDL = parse_theorem_gdl(theorem_GDL, self.parsed_predicate_GDL)
+        self.parsed_predicate_GDL, self.parsed_theorem_GDL = parse_gdl(predicate_GDL, theorem_GDL, gdl_cache_path)
         self.problem = None
 
     def load_problem(self, problem_CDL):
@@ -94,8 +93,9 @@ class Interactor:
             for letters, premise, conclusion in conclusions:
                 t_para = [letters[i] for i in self.parsed_theorem_GDL[t_name]["vars"]]
                 theorem = (t_name, branch, tuple(t_para))
-                for predicate, item in conclusion:  # add conclusion
-                    update = self.problem.add(predicate, item, premise, theorem) or update
+                added = self.problem.add_batch(  # add conclusion
+                    [(predicate, item, premise, theorem) for predicate, item in conclusion])
+                update = any(added) or update
                 self.problem.step(theorem, avg_timing)
 
         timing = time.time()  # timing
@@ -161,13 +161,15 @@ class Interactor:
                 self.problem.step(theorem, time.time() - timing)
                 continue
 
+            conclusions = []
             for predicate, item in gpl["conclusions"]:
                 if predicate == "Equal":  # algebra conclusion
                     eq = get_equation_from_tree(self.problem, item, True, letters)
-                    update = self.problem.add("Equation", eq, premises, theorem) or update
+                    conclusions.append(("Equation", eq, premises, theorem))
                 else:  # logic conclusion
                     item = tuple(letters[i] for i in item)
-                    update = self.problem.add(predicate, item, premises, theorem) or update
+                    conclusions.append((predicate, item, premises, theorem))
+            update = any(self.problem.add_batch(conclusions)) or update
 
             self.problem.step(theorem, time.time() - timing)
 
@@ -199,8 +201,9 @@ class Interactor:
             t_para = [letters[i] for i in self.parsed_theorem_GDL[t_name]["vars"]]
             theorem = (t_name, t_branch, tuple(t_para))
 
-            for predicate, item in conclusion:  # add conclusion
-                update = self.problem.add(predicate, item, premise, theorem) or update
+            added = self.problem.add_batch(  # add conclusion
+                [(predicate, item, premise, theorem) for predicate, item in conclusion])
+            update = any(added) or update
             self.problem.step(theorem, avg_timing)
 
         timing = time.time()  # timing
@@ -257,13 +260,15 @@ class Interactor:
                 self.problem.step(theorem, time.time() - timing)
                 return False
 
+        conclusions = []
         for predicate, item in gpl["conclusions"]:
             if predicate == "Equal":  # algebra conclusion
                 eq = get_equation_from_tree(self.problem, item, True, letters)
-                update = self.problem.add("Equation", eq, premises, theorem) or update
+                conclusions.append(("Equation", eq, premises, theorem))
             else:  # logic conclusion
                 item = tuple(letters[i] for i in item)
-                update = self.problem.add(predicate, item, premises, theorem) or update
+                conclusions.append((predicate, item, premises, theorem))
+        update = any(self.problem.add_batch(conclusions)) or update
         self.problem.step(theorem, time.time() - timing)
 
         timing = time.time()  # timing
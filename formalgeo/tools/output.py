@@ -80,6 +80,8 @@ def show_solution(problem):
     print("\033[33mSymbols and Value:\033[0m")
     for attr in problem.condition.sym_of_attr:
         sym = problem.condition.sym_of_attr[attr]
+        if attr[0] != "Free":
+            attr = (attr[0], problem.condition.decode(attr[1]))
         if isinstance(problem.condition.value_of_sym[sym], Float):
             print("{0:^70}{1:^15}{2:^20.3f}".format(
                 "{}({})".format(attr[0], "".join(attr[1])), str(sym), problem.condition.value_of_sym[sym]))
@@ -208,7 +210,7 @@ def get_meta_hypertree(problem):
     if problem.goal.solved:
         if problem.goal.type == "algebra":
             eq = problem.goal.item - problem.goal.answer
-            if eq not in problem.condition.get_items_by_predicate("Equation"):  # target not in condition set
+            if ("Equation", str(eq)) not in problem.condition.id_of_item:  # target not in condition set
                 node_id = problem.condition.id_count
                 cdl[node_id] = "Equation" + "(" + str(eq).replace(" ", "") + ")"
                 theorem = inverse_parse_one_theorem(problem.goal.theorem, problem.parsed_theorem_GDL)
@@ -3,9 +3,11 @@
 # Contact: xiaokaizhang1999@163.com
 
 __all__ = [
-    "method", "strategy", "get_args", "check_search", "check_run"
+    "method", "strategy", "method_strategy", "check_method_strategy", "get_args", "get_result_filenames",
+    "open_journal", "append_result", "load_search_result", "compact_search_result", "check_search", "check_run"
 ]
 
-from fgps.utils import method, strategy, get_args
+from fgps.utils import method, strategy, method_strategy, check_method_strategy, get_args
+from fgps.utils import get_result_filenames, open_journal, append_result, load_search_result, compact_search_result
 from fgps.check_search import check_search
 from fgps.check_run import check_run
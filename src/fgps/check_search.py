@@ -1,6 +1,5 @@
 import os.path
-from fgps import method, strategy, get_args
-from formalgeo.tools import load_json
+from fgps import method, strategy, get_args, load_search_result
 from formalgeo.data import DatasetLoader
 import matplotlib.pyplot as plt
 
@@ -42,20 +41,22 @@ def check_search(path_datasets, dataset_name, path_logs):
     for i in range(level_count + 1):
         print("{}\t".format(problem_total[i]), end="")
 
-    print("\n\nroughly\nmethod\tstrategy\tsolved\tunsolved\ttimeout\terror\tunhandled")
+    print("\n\nroughly\nmethod\tstrategy\tsolved\tunsolved\ttimeout\tmemout\terror\tunhandled")
     for m in method:
         for s in strategy:
-            log = load_json(os.path.join(path_logs, "search", "{}-log-{}-{}.json".format(dataset_name, m, s)))
+            log, _ = load_search_result(path_logs, dataset_name, m, s)
             solved = len(log["solved_pid"])
             unsolved = len(log["unsolved_pid"])
             timeout = len(log["timeout_pid"])
+            memout = len(log["memout_pid"])
             error = len(log["error_pid"])
-            unhandled = problem_total[0] - (solved + unsolved + timeout + error)
-            print("{}\t{}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}".format(
+            unhandled = problem_total[0] - (solved + unsolved + timeout + memout + error)
+            print("{}\t{}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}".format(
                 m.upper(), s.upper(),
                 solved / problem_total[0] * 100,
                 unsolved / problem_total[0] * 100,
                 timeout / problem_total[0] * 100,
+                memout / problem_total[0] * 100,
                 error / problem_total[0] * 100,
                 unhandled / problem_total[0] * 100))
 
@@ -67,8 +68,9 @@ def check_search(path_datasets, dataset_name, path_logs):
 
     for m in method:
         for s in strategy:
-            data = load_json(os.path.join(path_logs, "search", "{}-data-{}-{}.json".format(dataset_name, m, s)))
+            _, data = load_search_result(path_logs, dataset_name, m, s)
             data["unsolved"].update(data["timeout"])
+            data["unsolved"].update(data["memout"])
             data["unsolved"].update(data["error"])
             i = i_map[(m, s)]
 
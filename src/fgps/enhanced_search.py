@@ -41,13 +41,10 @@ def check_problem_has_solution(dl, problem_id):
 def enhanced_search(args):
     """增强版搜索函数，会跳过已有解题步骤的问题"""
     dl = DatasetLoader(args.dataset_name, args.path_datasets)
-    log_filename, data_filename = init_search_log(args, dl)
-    log = load_json(log_filename)
-    data = load_json(data_filename)
+    m, s = get_search_name(args)
+    _, _, journal_filename = init_search_log(args, dl)
+    log, _ = load_search_result(args.path_logs, args.dataset_name, m, s)
     problem_ids = []  # problem id
-    process_ids = []  # process id
-    
-    reply_queue = Queue()
     
     skipped_with_solutions = 0
     skipped_in_log = 0
@@ -60,7 +57,7 @@ def enhanced_search(args):
     for problem_id in test_problem_ids:  # assign tasks
         # 首先检查日志中是否已处理
         if problem_id in log["solved_pid"] or problem_id in log["unsolved_pid"] or \
-                problem_id in log["timeout_pid"] or problem_id in log["error_pid"]:
+                problem_id in log["timeout_pid"] or problem_id in log["memout_pid"] or problem_id in log["error_pid"]:
             skipped_in_log += 1
             continue
         
@@ -84,33 +81,9 @@ def enhanced_search(args):
         print("🎉 所有问题都已处理或有解题步骤！")
         return
     
-    clean_count = 0
-    print("\nprocess_id\tproblem_id\tresult\tmsg")
-    # The loop should continue as long as there are problems to be processed or there are active processes running.
-    while (clean_count < 23 and problem_ids) or process_ids:
-        start_process(args, dl, problem_ids, process_ids, reply_queue)  # search
-        
-        if not process_ids and not problem_ids:  # 如果没有活跃进程且没有待处理问题
-            break
-            
-        try:
-            process_id, problem_id, result, msg, timing, step_size = reply_queue.get()
-            data[result][str(problem_id)] = {"msg": msg, "timing": timing, "step_size": step_size}
-            log["{}_pid".format(result)].append(problem_id)
-            safe_save_json(log, log_filename)
-            safe_save_json(data, data_filename)
-            print("{}\t{}\t{}\t{}".format(process_id, problem_id, result, msg))
-
-            if process_id in process_ids:
-                process_ids.pop(process_ids.index(process_id))
-            clean_count += 1
-            if clean_count == int(args.process_count / 3):
-                clean_process(process_ids)
-                clean_count = 0
-        
-        except Exception as e:
-            print(f"等待结果时出错: {type(e).__name__} - {e}")
-            break
+    print()
+    run_tasks(args, dl, problem_ids[::-1], journal_filename, get_portfolio(args))
+    compact_search_result(args.path_logs, args.dataset_name, m, s)
 
 def enhanced_test_search(args, problem_id):
     """增强版测试搜索函数"""
@@ -16,7 +16,7 @@ def auto_run(path_datasets, dataset_name, path_logs):
     log = load_json(log_filename)
 
     dl = DatasetLoader(dataset_name, path_datasets)
-    solver = Interactor(dl.predicate_GDL, dl.theorem_GDL)
+    solver = Interactor(dl.predicate_GDL, dl.theorem_GDL, dl.gdl_cache_path)
     warnings.filterwarnings("ignore")
     print("pid\tcorrect_answer\tsolved\tsolved_answer\ttiming(s)")
 
@@ -49,7 +49,7 @@ def auto_run(path_datasets, dataset_name, path_logs):
 
 def run(path_datasets, dataset_name, path_logs):
     dl = DatasetLoader(dataset_name, path_datasets)
-    solver = Interactor(dl.predicate_GDL, dl.theorem_GDL)
+    solver = Interactor(dl.predicate_GDL, dl.theorem_GDL, dl.gdl_cache_path)
     while True:
         try:
             pid = input("<pid>:")
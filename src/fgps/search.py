@@ -4,12 +4,21 @@ import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'gdl'))
 
-from formalgeo.solver import ForwardSearcher, BackwardSearcher
-from formalgeo.tools import load_json, save_json, safe_save_json
+from formalgeo.solver import ForwardSearcher, BackwardSearcher, BidirectionalSearcher
+from formalgeo.tools import load_json, save_json
 from formalgeo.data import DatasetLoader
-from fgps import method, strategy, get_args
-from multiprocessing import Process, Queue
+from formalgeo.parse import parse_gdl
+from formalgeo.core import EquationKiller as EqKiller
+from fgps import method, strategy, get_args, check_method_strategy
+from fgps import get_result_filenames, open_journal, append_result, load_search_result, compact_search_result
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+from collections import deque
+import queue
 from func_timeout import func_timeout, FunctionTimedOut
+import gc
+import copy
+import threading
 import random
 import warnings
 import time
@@ -17,34 +26,30 @@ import psutil
 
 
 def init_search_log(args, dl):
-    data = {"solved": {}, "unsolved": {}, "timeout": {}, "error": {}}
+    data = {"solved": {}, "unsolved": {}, "timeout": {}, "memout": {}, "error": {}}
     log = {"start_pid": 1, "end_pid": dl.info["problem_number"], "solved_pid": [], "unsolved_pid": [],
-           "timeout_pid": [], "error_pid": []}
+           "timeout_pid": [], "memout_pid": [], "error_pid": []}
 
-    log_filename = os.path.join(
-        args.path_logs, "search", "{}-log-{}-{}.json".format(args.dataset_name, args.method, args.strategy))
-    data_filename = os.path.join(
-        args.path_logs, "search", "{}-data-{}-{}.json".format(args.dataset_name, args.method, args.strategy))
+    m, s = get_search_name(args)
+    log_filename, data_filename, journal_filename = get_result_filenames(args.path_logs, args.dataset_name, m, s)
 
-    if log_filename not in os.listdir(os.path.join(args.path_logs, "search")):
+    if not os.path.exists(log_filename):
         save_json(log, log_filename)
         save_json(data, data_filename)
 
-    return log_filename, data_filename
+    return log_filename, data_filename, journal_filename
 
 
 def sort_search_result(args):
+    """Sort search results by problem id, the result journal is merged into log and data in one pass."""
     print("direction\tmethod\tunhandled")
     for m in method:
         for s in strategy:
             unhandled = []
-            log_filename = os.path.join(args.path_logs, "search", "{}-log-{}-{}.json".format(args.dataset_name, m, s))
-            data_filename = os.path.join(args.path_logs, "search", "{}-data-{}-{}.json".format(args.dataset_name, m, s))
-            log = load_json(log_filename)
-            data = load_json(data_filename)
+            log, data = load_search_result(args.path_logs, args.dataset_name, m, s)
             new_log = {"start_pid": 1, "end_pid": log["end_pid"],
-                       "solved_pid": [], "unsolved_pid": [], "timeout_pid": [], "error_pid": []}
-            new_data = {"solved": {}, "unsolved": {}, "timeout": {}, "error": {}}
+                       "solved_pid": [], "unsolved_pid": [], "timeout_pid": [], "memout_pid": [], "error_pid": []}
+            new_data = {"solved": {}, "unsolved": {}, "timeout": {}, "memout": {}, "error": {}}
 
             for pid in range(1, log["end_pid"] + 1):
                 if str(pid) in data["solved"]:
@@ -59,49 +64,77 @@ def sort_search_result(args):
                 elif str(pid) in data["timeout"]:
                     new_data["timeout"][str(pid)] = data["timeout"][str(pid)]
                     new_log["timeout_pid"].append(pid)
+                elif str(pid) in data["memout"]:
+                    new_data["memout"][str(pid)] = data["memout"][str(pid)]
+                    new_log["memout_pid"].append(pid)
                 else:
                     unhandled.append(pid)
-            safe_save_json(new_log, log_filename)
-            safe_save_json(new_data, data_filename)
+            compact_search_result(args.path_logs, args.dataset_name, m, s, new_log, new_data)
 
             print("{}\t{}\t({}){}".format(m, s, len(unhandled), unhandled))
 
 
-def solve(args, dl, problem_id, reply_queue, debug=False):
+def get_searcher(args, dl, debug=False):
+    """Build searcher by args, GDL is parsed and t_info is loaded here."""
+    t_info = load_json(os.path.join(dl.dataset_path, "files/t_info.json"))
+    snapshot_path = dl.snapshot_path if args.snapshot else None
+    ForwardSearcher.parallel_count = args.parallel_count
+    BackwardSearcher.parallel_count = args.parallel_count
+    if args.method == "fw":
+        return ForwardSearcher(dl.predicate_GDL, dl.theorem_GDL, args.strategy, args.max_depth, args.beam_size,
+                               t_info, debug=debug, gdl_cache_path=dl.gdl_cache_path, snapshot_path=snapshot_path)
+
+    BackwardSearcher.frontier_limit = args.frontier_limit if args.frontier_limit > 0 else None
+    BackwardSearcher.memory_limit = args.memory_limit if args.memory_limit > 0 else None
+    return (BackwardSearcher if args.method == "bw" else BidirectionalSearcher)(
+        dl.predicate_GDL, dl.theorem_GDL, args.strategy, args.max_depth, args.beam_size, t_info, debug=debug,
+        gdl_cache_path=dl.gdl_cache_path, snapshot_path=snapshot_path)
+
+
+def solve(args, dl, problem_id, reply_queue, debug=False, searcher=None):
     """
-    Start a process to solve problem.
+    Solve problem and put result to reply_queue.
     :param args: <argparse>, (args.method, args.strategy, args.max_depth, args.beam_size, args.timeout).
     :param problem_id: <int>, problem id.
     :param dl: <DatasetLoader>, use dl loading predicate_GDL, theorem_GDL and t_info.
     :param reply_queue: <Queue>, return solved result through this queue.
     :param debug: <Bool>, debug output.
+    :param searcher: searcher reused by worker, build a new one when None.
     """
     warnings.filterwarnings("ignore")
     random.seed(args.random_seed)
-    if args.method == "fw":
-        searcher = ForwardSearcher(
-            dl.predicate_GDL, dl.theorem_GDL,
-            args.strategy, args.max_depth, args.beam_size,
-            load_json(os.path.join(dl.dataset_path, "files/t_info.json")),
-            debug=debug
-        )
-    else:
-        searcher = BackwardSearcher(
-            dl.predicate_GDL, dl.theorem_GDL,
-            args.strategy, args.max_depth, args.beam_size,
-            load_json(os.path.join(dl.dataset_path, "files/t_info.json")),
-            debug=debug
-        )
+    if searcher is None:
+        searcher = get_searcher(args, dl, debug)
 
     timing = time.time()
-    if not debug:
+    EqKiller.use_cache = True  # caches of solved equations are only valid for one problem
+    EqKiller.cache_eqs = {}
+    EqKiller.cache_target = {}
+    if debug:  # search in current process and print result, exceptions are raised
+        searcher.init_search(dl.get_problem(problem_id))
+        try:
+            solved, seqs = func_timeout(args.timeout, searcher.search)
+            result = "solved" if solved else "unsolved"
+        except FunctionTimedOut:
+            result, seqs = "timeout", None
+        print("pid={}, result={}, timing={:.2f}s, step_size={}, seqs={}".format(
+            problem_id, result, time.time() - timing, searcher.step_size, seqs))
+    else:
+        finished = threading.Event()
+        memout = threading.Event()
         try:
             searcher.init_search(dl.get_problem(problem_id))
+            if args.problem_memory > 0:
+                threading.Thread(target=watch_memory, args=(searcher, args.problem_memory, finished, memout),
+                                 daemon=True).start()
             solved, seqs = func_timeout(args.timeout, searcher.search)
             
             item_to_queue = None
             if solved:
                 item_to_queue = (os.getpid(), problem_id, "solved", seqs, time.time() - timing, searcher.step_size)
+            elif memout.is_set():
+                item_to_queue = (os.getpid(), problem_id, "memout", str(args.problem_memory), time.time() - timing,
+                                 searcher.step_size)
             else:
                 item_to_queue = (os.getpid(), problem_id, "unsolved", "None", time.time() - timing, searcher.step_size)
             
@@ -124,67 +157,343 @@ def solve(args, dl, problem_id, reply_queue, debug=False):
             import traceback
             error_info = f"Exception: {repr(e)}\n{traceback.format_exc()}"
             reply_queue.put((os.getpid(), problem_id, "error", error_info, time.time() - timing, getattr(searcher, 'step_size', -1)))
+        finally:
+            finished.set()
+
+
+def watch_memory(searcher, problem_memory, finished, memout):
+    """
+    Watch RSS of search process until finished is set. Searcher is asked to trim its frontier and caches when
+    RSS exceeds <trim_ratio> of problem_memory (MB). Freed memory is usually kept by the allocator, so RSS
+    measured after trimming is taken as the new baseline. When RSS grows by <growth_ratio> of problem_memory
+    since then, searcher is asked to trim again, or to stop and memout is set if RSS also exceeds problem_memory.
+    """
+    trim_ratio = 0.8
+    growth_ratio = 0.1
+    process = psutil.Process()
+    trimmed_rss = None  # RSS right after last trimming
+    trimming = False
+    while not finished.wait(0.5):
+        if searcher.trim_requested:
+            continue
+        rss = process.memory_info().rss / 1024 / 1024
+        if trimming:
+            trimmed_rss = rss
+            trimming = False
+        elif trimmed_rss is None:
+            if rss > problem_memory * trim_ratio:
+                searcher.request_trim()
+                trimming = True
+        elif rss - trimmed_rss > problem_memory * growth_ratio:
+            if rss > problem_memory:
+                memout.set()
+                searcher.request_stop()
+                return
+            searcher.request_trim()
+            trimming = True
 
 
-def start_process(args, dl, problem_ids, process_ids, reply_queue):
-    """Remove non-existent pid and start new process"""
-    while len(problem_ids) > 0 and args.process_count - len(process_ids) > 0:
-        problem_id = problem_ids.pop()
-        process = Process(target=solve, args=(args, dl, problem_id, reply_queue))
-        process.start()
-        process_ids.append(process.pid)
+def worker(args, dl, conn):
+    """
+    Long-lived search process. GDL is parsed once and one searcher of each (method, strategy) is reused for all
+    problems received from conn. Reply (result, rss) of each (problem_id, method, strategy) through conn, and exit
+    when receive None.
+    """
+    warnings.filterwarnings("ignore")
+    searchers = {}  # {(method, strategy): (args, searcher)}
+    process = psutil.Process()
+    reply_queue = queue.Queue()
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        problem_id, m, s = task
+        if (m, s) not in searchers:
+            config_args = copy.copy(args)
+            config_args.method, config_args.strategy = m, s
+            searchers[(m, s)] = (config_args, get_searcher(config_args, dl))
+        config_args, searcher = searchers[(m, s)]
+        solve(config_args, dl, problem_id, reply_queue, searcher=searcher)
+        conn.send((reply_queue.get(), process.memory_info().rss / 1024 / 1024))
+
+
+def start_worker(args, dl, workers):
+    """Start a worker and add it to workers."""
+    conn, child_conn = Pipe()
+    process = Process(target=worker, args=(args, dl, child_conn))
+    process.start()
+    child_conn.close()
+    workers[conn] = [process, 0]  # process, task count
+
+
+def stop_worker(conn, workers):
+    """Stop worker and remove it from workers."""
+    process = workers.pop(conn)[0]
+    if process.is_alive():
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+    process.join()
+    conn.close()
+
+
+def get_problem_costs(args, dl, problem_ids):
+    """
+    Predict search timing (seconds) of problems, used to schedule the longest problems first.
+    Problem searched by other methods or strategies is predicted by its mean historical timing. Others are
+    predicted by problem_level * CDL count, scaled to seconds by problems that have both. Predictions are
+    capped by args.timeout.
+    :return costs: <dict>, {problem_id: cost}.
+    """
+    history = {}  # {problem_id: [timing]}
+    search_name = get_search_name(args)
+    path_search = os.path.join(args.path_logs, "search")
+    prefix = "{}-log-".format(args.dataset_name)
+    for filename in os.listdir(path_search) if os.path.exists(path_search) else []:
+        if not filename.startswith(prefix) or not filename.endswith(".json"):
+            continue
+        m, sep, s = filename[len(prefix):-len(".json")].partition("-")
+        if sep == "" or m == "" or s == "" or (m, s) == search_name:  # not a search log, or the current one
+            continue
+        _, data = load_search_result(args.path_logs, args.dataset_name, m, s)
+        for result in data:
+            for pid in data[result]:
+                if data[result][pid]["timing"] >= 0:
+                    history.setdefault(int(pid), []).append(min(data[result][pid]["timing"], args.timeout))
 
+    estimates = {}  # {problem_id: problem_level * CDL count}
+    for problem_id in problem_ids:
+        problem_CDL = dl.get_problem(problem_id)
+        cdl_count = len(problem_CDL["construction_cdl"]) + len(problem_CDL["text_cdl"]) + \
+            len(problem_CDL["image_cdl"])
+        estimates[problem_id] = problem_CDL.get("problem_level", 1) * (1 + cdl_count)
 
-def clean_process(process_ids):
-    for i in range(len(process_ids))[::-1]:
-        if process_ids[i] not in psutil.pids():
-            process_ids.pop(i)
+    calibrated = [pid for pid in problem_ids if pid in history]
+    scale = 1
+    if len(calibrated) > 0:
+        scale = sum(sum(history[pid]) / len(history[pid]) for pid in calibrated) / \
+            sum(estimates[pid] for pid in calibrated)
+
+    costs = {}
+    for problem_id in problem_ids:
+        if problem_id in history:
+            costs[problem_id] = sum(history[problem_id]) / len(history[problem_id])
+        else:
+            costs[problem_id] = min(estimates[problem_id] * scale, args.timeout)
+    return costs
+
+
+def run_tasks(args, dl, problem_ids, journal_filename, configs=None):
+    """
+    Solve problems in the order of problem_ids by a pool of long-lived workers and append results to the journal.
+    Idle worker takes the next problem, so with problems sorted by cost no worker is left with a long problem at
+    the end while others are idle. A worker is replaced by a new one after args.worker_tasks problems or when its
+    memory exceeds args.worker_memory (MB), and after a timeout, since func_timeout doesn't wait for the search
+    thread to stop and the thread may still change the searcher reused by the worker. Problem that a dead worker
+    was solving is recorded as error, and worker that doesn't reply in args.timeout + <hard_timeout_delay> seconds
+    is killed and its problem is recorded as timeout. Problems are limited to args.problem_memory (MB) by workers themselves, see <watch_memory>, and
+    worker whose memory exceeds <hard_memory_ratio> times of it, such as stuck in one long step, is killed and
+    its problem is recorded as memout.
+    :param configs: <list> of (method, strategy), configs raced on each problem in portfolio mode. The first
+    solution is recorded with its config and workers still searching the problem are killed. When no config
+    solves the problem, its result is timeout if any config timed out, otherwise unsolved or error.
+    None means searching by (args.method, args.strategy) only.
+    """
+    hard_timeout_delay = 60  # func_timeout can't interrupt some C extensions, kill worker after this delay
+    hard_memory_ratio = 1.5  # worker can't stop search in one step, kill worker when memory exceeds this ratio
+    rank = {"error": 0, "unsolved": 1, "memout": 2, "timeout": 3, "solved": 4}  # result of problem is the best one
+    portfolio = configs is not None
+    if configs is None:
+        configs = [(args.method, args.strategy)]
+    tasks = deque((problem_id, m, s) for problem_id in problem_ids for m, s in configs)
+    pending = {problem_id: [len(configs), None] for problem_id in problem_ids}  # {problem_id: [count, best]}
+    workers = {}  # {conn: [Process, task_count]}
+    running = {}  # {conn: (task, start_time)}
+
+    parse_gdl(dl.predicate_GDL, dl.theorem_GDL, dl.gdl_cache_path)  # parsed once here and inherited by forked workers
+    gc.freeze()  # inherited objects are not tracked by gc of workers, so their memory pages are not copied
+    journal = open_journal(journal_filename)
+
+    def save_result(process_id, problem_id, result, msg, timing, step_size, config=None):
+        append_result(journal, problem_id, result, msg, timing, step_size, config)
+        if config is None:
+            print("{}\t{}\t{}\t{}".format(process_id, problem_id, result, msg))
+        else:
+            print("{}\t{}\t{}\t{}\t{}".format(process_id, problem_id, result, config, msg))
+
+    def finish(task, reply):
+        """Collect reply of task, save result of problem when it is solved or all its configs are finished."""
+        problem_id, m, s = task
+        if problem_id not in pending:  # solved by another config
+            return
+        count, best = pending[problem_id]
+        if best is None or rank[reply[2]] > rank[best[0][2]]:
+            best = (reply, "{}-{}".format(m, s))
+        pending[problem_id] = [count - 1, best]
+        if best[0][2] != "solved" and count > 1:
+            return
+        pending.pop(problem_id)
+        save_result(*best[0], config=best[1] if portfolio else None)
+        for conn in [conn for conn in running if running[conn][0][0] == problem_id]:  # cancel other configs
+            workers[conn][0].kill()
+            running.pop(conn)
+            stop_worker(conn, workers)
+
+    if portfolio:
+        print("process_id\tproblem_id\tresult\tconfig\tmsg")
+    else:
+        print("process_id\tproblem_id\tresult\tmsg")
+    while len(tasks) > 0 or len(running) > 0:
+        while len(tasks) > 0 and tasks[0][0] not in pending:  # skip configs of solved problems
+            tasks.popleft()
+        while len(workers) < min(args.process_count, len(tasks) + len(running)):
+            start_worker(args, dl, workers)
+        for conn in workers:  # assign tasks to idle workers
+            while conn not in running and len(tasks) > 0:
+                task = tasks.popleft()
+                if task[0] in pending:
+                    conn.send(task)
+                    running[conn] = (task, time.time())
+                    workers[conn][1] += 1
+
+        for conn in wait(list(running), timeout=1):
+            if conn not in running:  # cancelled
+                continue
+            process = workers[conn][0]
+            task, start_time = running.pop(conn)
+            try:
+                reply, rss = conn.recv()
+            except EOFError:  # worker died
+                process.join()
+                stop_worker(conn, workers)
+                finish(task, (process.pid, task[0], "error", "Worker exited with code {}.".format(process.exitcode),
+                              time.time() - start_time, -1))
+                continue
+            if 0 < args.worker_tasks <= workers[conn][1] or 0 < args.worker_memory < rss or \
+                    reply[2] in ["timeout", "memout"]:  # search thread may still run after timeout, don't reuse
+                stop_worker(conn, workers)
+            finish(task, reply)
+
+        for conn in list(running):
+            if conn not in running:  # cancelled
+                continue
+            task, start_time = running[conn]
+            if time.time() - start_time > args.timeout + hard_timeout_delay:
+                process = workers[conn][0]
+                process.kill()
+                running.pop(conn)
+                stop_worker(conn, workers)
+                finish(task, (process.pid, task[0], "timeout", str(args.timeout), time.time() - start_time, -1))
+                continue
+            if args.problem_memory > 0:
+                process = workers[conn][0]
+                try:
+                    rss = psutil.Process(process.pid).memory_info().rss / 1024 / 1024
+                except psutil.Error:  # worker exited, handled when reading its conn
+                    continue
+                if rss > args.problem_memory * hard_memory_ratio:
+                    process.kill()
+                    running.pop(conn)
+                    stop_worker(conn, workers)
+                    finish(task, (process.pid, task[0], "memout", str(args.problem_memory),
+                                  time.time() - start_time, -1))
+
+    for conn in list(workers):
+        stop_worker(conn, workers)
+    journal.close()
+
+
+def get_portfolio(args):
+    """Return <list> of (method, strategy) raced on each problem, None when not in portfolio mode."""
+    if args.portfolio == "":
+        return None
+    configs = []
+    for config in args.portfolio.split(","):
+        m, _, s = config.strip().partition("-")
+        check_method_strategy(m, s)
+        configs.append((m, s))
+    return configs
+
+
+def get_search_name(args):
+    """Return (method, strategy) that names search logs, such as ('portfolio', 'fw-bfs+bw-dfs') in portfolio mode."""
+    configs = get_portfolio(args)
+    if configs is None:
+        return args.method, args.strategy
+    return "portfolio", "+".join("{}-{}".format(m, s) for m, s in configs)
 
 
 def search(args):
-    """Auto run search on all problems."""
+    """Auto run search on all problems, resume from the handled ones."""
     dl = DatasetLoader(args.dataset_name, args.path_datasets)
-    log_filename, data_filename = init_search_log(args, dl)
-    log = load_json(log_filename)
-    data = load_json(data_filename)
+    m, s = get_search_name(args)
+    _, _, journal_filename = init_search_log(args, dl)
+    log, _ = load_search_result(args.path_logs, args.dataset_name, m, s)
+    handled = set(log["solved_pid"] + log["unsolved_pid"] + log["timeout_pid"] + log["memout_pid"] +
+                  log["error_pid"])
     problem_ids = []  # problem id
-    process_ids = []  # process id
-
-    reply_queue = Queue()
 
     for problem_id in range(log["start_pid"], log["end_pid"] + 1):  # assign tasks
-        if problem_id in log["solved_pid"] or problem_id in log["unsolved_pid"] or \
-                problem_id in log["timeout_pid"] or problem_id in log["error_pid"]:
+        if problem_id in handled:
             continue
         problem_ids.append(problem_id)
-    problem_ids = problem_ids[::-1]
-
-    clean_count = 0
-    print("process_id\tproblem_id\tresult\tmsg")
-    while (clean_count<23):
-        start_process(args, dl, problem_ids, process_ids, reply_queue)  # search
-
-        process_id, problem_id, result, msg, timing, step_size = reply_queue.get()
-        data[result][str(problem_id)] = {"msg": msg, "timing": timing, "step_size": step_size}
-        log["{}_pid".format(result)].append(problem_id)
-        safe_save_json(log, log_filename)
-        safe_save_json(data, data_filename)
-        print("{}\t{}\t{}\t{}".format(process_id, problem_id, result, msg))
-
-        if process_id in process_ids:
-            process_ids.pop(process_ids.index(process_id))
-        clean_count += 1
-        if clean_count == int(args.process_count / 3):
-            clean_process(process_ids)
-            clean_count = 0
-            
+    if args.schedule == "cost":  # longest first
+        costs = get_problem_costs(args, dl, problem_ids)
+        problem_ids.sort(key=lambda pid: (-costs[pid], pid))
+
+    run_tasks(args, dl, problem_ids, journal_filename, get_portfolio(args))
+    compact_search_result(args.path_logs, args.dataset_name, m, s)
+
 
 def test_search(args, problem_id):
     dl = DatasetLoader(args.dataset_name, args.path_datasets)
     solve(args, dl, problem_id, None, True)
 
 
+def benchmark_search(args, problem_id, process_counts=(0, 2, 4, 8)):
+    """Search one problem with different parallel process counts and print timing and speedup."""
+    warnings.filterwarnings("ignore")
+    dl = DatasetLoader(args.dataset_name, args.path_datasets)
+    t_info = load_json(os.path.join(dl.dataset_path, "files/t_info.json"))
+    print("process_count\tresult\ttiming\tstep_size\tstep/s\tspeedup")
+    base_speed = None
+    for process_count in process_counts:
+        random.seed(args.random_seed)
+        if args.method == "fw":
+            ForwardSearcher.parallel_count = process_count
+            searcher = ForwardSearcher(dl.predicate_GDL, dl.theorem_GDL, args.strategy, args.max_depth,
+                                       args.beam_size, t_info, gdl_cache_path=dl.gdl_cache_path)
+        else:
+            BackwardSearcher.parallel_count = process_count
+            searcher = BackwardSearcher(dl.predicate_GDL, dl.theorem_GDL, args.strategy, args.max_depth,
+                                        args.beam_size, t_info, gdl_cache_path=dl.gdl_cache_path)
+        searcher.init_search(dl.get_problem(problem_id))
+        timing = time.time()
+        try:
+            solved, _ = func_timeout(args.timeout, searcher.search)
+            result = "solved" if solved else "unsolved"
+        except FunctionTimedOut:
+            result = "timeout"
+        timing = time.time() - timing
+        speed = searcher.step_size / timing
+        if base_speed is None:
+            base_speed = speed
+        print("{}\t{}\t{:.2f}\t{}\t{:.2f}\t{:.2f}".format(
+            process_count, result, timing, searcher.step_size, speed, speed / base_speed))
+    ForwardSearcher.parallel_count = 0
+    BackwardSearcher.parallel_count = 0
+
+
 if __name__ == '__main__':
-    #test_search(get_args(), problem_id=1)
-    search(get_args())
+    args = get_args()
+    if args.func == "test_search":
+        test_search(args, args.problem_id)
+    elif args.func == "benchmark_search":
+        benchmark_search(args, args.problem_id)
+    else:
+        search(args)
     
\ No newline at end of file
@@ -1,10 +1,25 @@
 import os
-from formalgeo.data import download_dataset
+import json
+from formalgeo.data import download_dataset, pack_dataset
+from formalgeo.tools import load_json, safe_save_json
 import psutil
 import argparse
 
 method = ["fw", "bw"]  # forward, backward
 strategy = ["bfs", "dfs", "rs", "bs"]  # deep first, breadth first, random, beam
+method_strategy = {  # strategies supported by each method
+    "fw": ("bfs", "dfs", "rs", "bs", "bestfirst"),
+    "bw": ("bfs", "dfs", "rs", "bs", "ids"),
+    "bd": ("bfs", "dfs", "rs", "bs", "bestfirst", "ids")
+}
+
+
+def check_method_strategy(m, s):
+    """Raise Exception when search method <m> not support strategy <s>."""
+    if m not in method_strategy or s not in method_strategy[m]:
+        e_msg = "Method '{}' not support strategy '{}', supported: {}.".format(
+            m, s, ", ".join("{}-{}".format(k, v) for k in method_strategy for v in method_strategy[k]))
+        raise Exception(e_msg)
 
 
 def get_args():
@@ -23,9 +38,10 @@ def get_args():
     # basic search para
     parser.add_argument("--dataset_name", type=str, required=False, default="formalgeo7k_v2",
                         help="dataset name")
-    parser.add_argument("--method", type=str, required=False, choices=("fw", "bw"), default="fw",
+    parser.add_argument("--method", type=str, required=False, choices=("fw", "bw", "bd"), default="fw",
                         help="search method")
-    parser.add_argument("--strategy", type=str, required=False, choices=("bfs", "dfs", "rs", "bs"), default="bfs",
+    parser.add_argument("--strategy", type=str, required=False, choices=("bfs", "dfs", "rs", "bs", "bestfirst", "ids"),
+                        default="bfs",
                         help="search strategy")
 
     # other search para
@@ -39,8 +55,33 @@ def get_args():
                         help="multi process count")
     parser.add_argument("--random_seed", type=int, required=False, default=700,
                         help="random seed")
-
-    return parser.parse_args()
+    parser.add_argument("--parallel_count", type=int, required=False, default=0,
+                        help="process count used to run theorems (fw) or expand SuperNodes (bw) of one problem, "
+                             "0 means sequential")
+    parser.add_argument("--problem_id", type=int, required=False, default=1,
+                        help="problem searched by '--func test_search' and '--func benchmark_search'")
+    parser.add_argument("--worker_tasks", type=int, required=False, default=100,
+                        help="problems solved by a search process before it is replaced, 0 means no limit")
+    parser.add_argument("--worker_memory", type=int, required=False, default=0,
+                        help="memory (MB) of a search process after which it is replaced, 0 means no limit")
+    parser.add_argument("--frontier_limit", type=int, required=False, default=0,
+                        help="max count of SuperNodes waiting to be expanded in backward search, 0 means no limit")
+    parser.add_argument("--memory_limit", type=int, required=False, default=0,
+                        help="max memory (MB) of backward search process, 0 means no limit")
+    parser.add_argument("--problem_memory", type=int, required=False, default=0,
+                        help="memory (MB) of a search process for one problem, exceeded is recorded as memout, "
+                             "0 means no limit")
+    parser.add_argument("--portfolio", type=str, required=False, default="",
+                        help="configs raced on each problem, such as 'fw-bfs,fw-bestfirst,bw-dfs', empty means not")
+    parser.add_argument("--schedule", type=str, required=False, choices=("id", "cost"), default="cost",
+                        help="order of problems, 'cost' means predicted longest first")
+    parser.add_argument("--snapshot", type=int, required=False, default=0,
+                        help="1 means reuse initialized problems saved in <dataset>/snapshots, 0 means not")
+
+    args = parser.parse_args()
+    check_method_strategy(args.method, args.strategy)
+
+    return args
 
 
 def create_log_archi(path_logs):
@@ -55,6 +96,85 @@ def create_log_archi(path_logs):
             os.makedirs(filepath)
 
 
+def get_result_filenames(path_logs, dataset_name, m, s):
+    """Return filenames of search log, search data and result journal."""
+    return (os.path.join(path_logs, "search", "{}-log-{}-{}.json".format(dataset_name, m, s)),
+            os.path.join(path_logs, "search", "{}-data-{}-{}.json".format(dataset_name, m, s)),
+            os.path.join(path_logs, "search", "{}-journal-{}-{}.jsonl".format(dataset_name, m, s)))
+
+
+def open_journal(journal_filename):
+    """Open result journal for appending, a broken last line is ended so that new results start on a new line."""
+    broken = False
+    if os.path.exists(journal_filename) and os.path.getsize(journal_filename) > 0:
+        with open(journal_filename, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            broken = f.read(1) != b"\n"
+    journal = open(journal_filename, "a", encoding="utf-8")
+    if broken:
+        journal.write("\n")
+    return journal
+
+
+def append_result(journal, problem_id, result, msg, timing, step_size, config=None):
+    """
+    Append one search result to opened journal as a JSON line, flushed at once.
+    :param config: <str>, 'method-strategy' that gives the result in portfolio mode, None when not recorded.
+    """
+    r = {"problem_id": problem_id, "result": result, "msg": msg, "timing": timing, "step_size": step_size}
+    if config is not None:
+        r["config"] = config
+    journal.write(json.dumps(r, ensure_ascii=False) + "\n")
+    journal.flush()
+
+
+def load_search_result(path_logs, dataset_name, m, s):
+    """
+    Load search log and data, and replay the result journal on them line by line.
+    Results in journal override the earlier ones of the same problem. A broken last line, written when the
+    search process was killed, is skipped.
+    :return log: <dict>, {"start_pid": <int>, "end_pid": <int>, "solved_pid": [<int>], ...}.
+    :return data: <dict>, {"solved": {problem_id: {"msg": msg, "timing": timing, "step_size": step_size}}, ...},
+    results of portfolio mode also have "config".
+    """
+    log_filename, data_filename, journal_filename = get_result_filenames(path_logs, dataset_name, m, s)
+    log = load_json(log_filename)
+    data = load_json(data_filename)
+    log.setdefault("memout_pid", [])  # logs saved before memout was recorded
+    data.setdefault("memout", {})
+    if not os.path.exists(journal_filename):
+        return log, data
+
+    with open(journal_filename, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            pid = str(r["problem_id"])
+            for result in data:
+                if pid in data[result]:
+                    data[result].pop(pid)
+                    log["{}_pid".format(result)].remove(r["problem_id"])
+            data[r["result"]][pid] = {"msg": r["msg"], "timing": r["timing"], "step_size": r["step_size"]}
+            if "config" in r:
+                data[r["result"]][pid]["config"] = r["config"]
+            log["{}_pid".format(r["result"])].append(r["problem_id"])
+
+    return log, data
+
+
+def compact_search_result(path_logs, dataset_name, m, s, log=None, data=None):
+    """Merge result journal into search log and data, then remove the journal."""
+    log_filename, data_filename, journal_filename = get_result_filenames(path_logs, dataset_name, m, s)
+    if log is None or data is None:
+        log, data = load_search_result(path_logs, dataset_name, m, s)
+    safe_save_json(log, log_filename)
+    safe_save_json(data, data_filename)
+    if os.path.exists(journal_filename):
+        os.remove(journal_filename)
+
+
 def download_datasets(path_datasets):
     if not os.path.exists(path_datasets):
         os.makedirs(path_datasets)
@@ -70,6 +190,8 @@ if __name__ == '__main__':
         download_datasets(args.path_datasets)
     elif args.func == "create_log_archi":
         create_log_archi(args.path_logs)
+    elif args.func == "pack_dataset":
+        pack_dataset(args.dataset_name, args.path_datasets)
     else:
         msg = "No function name {}.".format(args.func)
         raise Exception(msg)
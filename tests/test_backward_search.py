@@ -0,0 +1,165 @@
+import unittest
+from formalgeo.problem.condition import Condition
+from formalgeo.solver.backward_search import SearchContext, SuperNode, NodeState, GoalFinder, BackwardSearcher
+
+
+class FakeCondition:
+    def __init__(self):
+        self.id_count = 0
+
+    def has(self, predicate, item):
+        return False
+
+
+class FakeProblem:
+    def __init__(self):
+        self.condition = FakeCondition()
+        self.parsed_problem_CDL = {"id": 0}
+
+
+class FakeFinder:
+    def __init__(self, sub_goals):
+        self.sub_goals = sub_goals  # {(predicate, item): [(t_name, t_branch, t_para, sub_goals)]}
+
+    def find_all_sub_goals(self, predicate, item, problem):
+        return self.sub_goals.get((predicate, item), [])
+
+    def reset(self):
+        pass
+
+
+class TestTwinExpansion(unittest.TestCase):
+
+    def build(self, depth_limit, sub_goals):
+        context = SearchContext(FakeProblem(), FakeFinder(sub_goals), depth_limit, False)
+        root = SuperNode(None, None, 1, context)
+        return context, root
+
+    def test_twin_expands_when_canonical_is_cut_off(self):
+        goal = ("G", ("g",))
+        context, root = self.build(3, {goal: [("t_g", "1", ("g",), (("H", ("h",)),))]})
+        root.add_nodes([("A", ("a",))])
+        deep = SuperNode(root.nodes[0], ("t_a", "1", ("a",)), 3, context)  # canonical below depth limit
+        deep.add_nodes([goal])
+        canonical = deep.nodes[0]
+        canonical.expand()
+        self.assertTrue(context.cutoff)
+        self.assertEqual(len(canonical.children), 0)
+
+        shallow = SuperNode(root.nodes[0], ("t_b", "1", ("a",)), 2, context)
+        shallow.add_nodes([goal])
+        twin = shallow.nodes[0]
+        self.assertIs(twin.canonical, canonical)
+        twin.expand()
+        self.assertEqual(len(twin.children), 1)
+
+    def test_twin_released_when_canonical_is_cut_off_later(self):
+        goal = ("G", ("g",))
+        context, root = self.build(3, {goal: [("t_g", "1", ("g",), (("H", ("h",)),))]})
+        root.add_nodes([("A", ("a",))])
+        deep = SuperNode(root.nodes[0], ("t_a", "1", ("a",)), 3, context)
+        deep.add_nodes([goal])
+        shallow = SuperNode(root.nodes[0], ("t_b", "1", ("a",)), 2, context)
+        shallow.add_nodes([goal])
+        twin = shallow.nodes[0]
+        twin.state = NodeState.expanded  # popped while canonical not expanded yet
+        deep.nodes[0].expand()
+        self.assertEqual(len(twin.children), 1)
+
+    def test_twin_does_not_defer_to_ancestor(self):
+        goal = ("G", ("g",))
+        context, root = self.build(10, {goal: [("t_g", "1", ("g",), (("H", ("h",)),)),
+                                               ("t_k", "1", ("g",), (goal,))]})
+        root.add_nodes([goal])
+        canonical = root.nodes[0]
+        canonical.expand()
+        ring = [super_node for super_node in canonical.children if super_node.theorem[0] == "t_k"][0]
+        twin = ring.nodes[0]
+        self.assertIs(twin.canonical, canonical)
+        twin.expand()
+        self.assertGreater(len(twin.children), 0)
+
+
+class TestConditionVersion(unittest.TestCase):
+
+    def test_equation_version_ignores_unrelated_conditions(self):
+        problem = FakeProblem()
+        problem.condition.eq_version = 0
+        problem.condition.id_count = 5
+        problem.condition.ids_of_predicate = {"Point": [0, 1, 2], "Equation": [3, 4]}
+        finder = GoalFinder({}, {})
+        version = finder.get_condition_version("Equation", problem)
+
+        problem.condition.ids_of_predicate["Equation"].append(5)  # such as value of a sym solved
+        problem.condition.id_count = 6
+        self.assertEqual(finder.get_condition_version("Equation", problem), version)
+
+        problem.condition.eq_version = 1
+        self.assertNotEqual(finder.get_condition_version("Equation", problem), version)
+
+
+class FakeGoal:
+    def __init__(self, item, answer):
+        self.type = "logic"
+        self.item = item
+        self.answer = answer
+
+
+class TestIterativeDeepening(unittest.TestCase):
+
+    def build(self, strategy):
+        sub_goals = {}  # each goal can be derived from any other goal by its own theorem, never from facts
+        goals = [("G", (str(i),)) for i in range(4)]
+        for goal in goals:
+            sub_goals[goal] = [("t_{}_{}".format(goal[1][0], other[1][0]), "1", (), (other,))
+                               for other in goals if other != goal]
+        problem = FakeProblem()
+        problem.goal = FakeGoal("G", ("0",))
+        searcher = BackwardSearcher.__new__(BackwardSearcher)
+        searcher.strategy = strategy
+        searcher.max_depth = 20
+        searcher.debug = False
+        searcher.finder = FakeFinder(sub_goals)
+        searcher.context = None
+        searcher.load_problem(problem)
+        return searcher
+
+    def test_ids_ends_unsolved_where_dfs_does(self):
+        dfs = self.build("dfs")
+        while dfs.root.state not in [NodeState.success, NodeState.fail]:
+            super_node = dfs.pop_super_node()
+            if super_node is None or not dfs.expand_super_node(super_node):
+                break
+        self.assertNotEqual(dfs.root.state, NodeState.success)
+
+        ids = self.build("ids")
+        ids.search_iterative_deepening()
+        self.assertNotEqual(ids.root.state, NodeState.success)
+        self.assertEqual(ids.context.depth_limit, 3)  # the same goals and facts as depth 2, stop deepening
+        self.assertLess(ids.step_size, dfs.step_size)
+
+
+class TestParaCompletion(unittest.TestCase):
+
+    def test_free_vars_completed_by_point_codes(self):
+        self.assertEqual(GoalFinder.theorem_para_completion([["a", 17, 18]], [0, 17, 18]),
+                         {(0, 17, 18), (17, 17, 18), (18, 17, 18)})
+
+    def test_paras_joined_on_codes_and_decoded(self):
+        problem = FakeProblem()
+        problem.parsed_predicate_GDL = {}
+        problem.condition = Condition()
+        problem.condition.init_by_fl(["Point", "Line"], [])
+        for point in ["A", "B", "C"]:
+            problem.condition.add("Point", (point,), (-1,), ("prerequisite", None, None))
+        problem.condition.encode(("A", "B", "C"))
+        problem.condition.add("Line", ("A", "C"), (-1,), ("prerequisite", None, None))
+        finder = GoalFinder({}, {})
+        finder.para_constraints[("t", "1")] = [("Line", (0, 1))]
+
+        results = finder.complete_theorem_paras("t", "1", {("A", "b")}, problem)
+        self.assertEqual(results, {("A", "C")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import unittest
+import multiprocessing
+from formalgeo.solver.forward_search import ForwardSearcher
+
+
+class FakeCondition:
+    def __init__(self):
+        self.items = []
+        self.id_count = 0
+
+    def add(self, predicate, item):
+        self.items.append((predicate, item, (), "external", 0))
+        self.id_count += 1
+
+
+class FakeProblem:
+    def __init__(self):
+        self.condition = FakeCondition()
+
+    def add_batch(self, conditions, skip_check=False):
+        return [False for _ in conditions]
+
+
+class TestExternalConditions(unittest.TestCase):
+
+    def build(self):
+        searcher = ForwardSearcher.__new__(ForwardSearcher)
+        searcher.problem = FakeProblem()
+        searcher.trim_requested = False
+        searcher.stopped = False
+        searcher.last_id = 0
+        searcher.applied_count = 0
+        searcher.external_ids = []
+        return searcher
+
+    def test_conditions_added_between_selections_are_kept(self):
+        searcher = self.build()
+        searcher.problem.condition.add("Line", ("A", "B"))  # such as by backward half of bidirectional search
+        searcher.problem.condition.add("Line", ("B", "C"))
+        self.assertIsNone(searcher.apply_and_check_goal((("t", "1", ()), (("Line", ("C", "D"), ()),))))
+        self.assertEqual(searcher.external_ids, [0, 1])
+        self.assertEqual(searcher.last_id, 2)
+
+        searcher.apply_and_check_goal((("t", "1", ()), (("Line", ("C", "D"), ()),)))  # delivered only once
+        self.assertEqual(searcher.external_ids, [0, 1])
+
+
+def _getpid(_):
+    return os.getpid()
+
+
+@unittest.skipIf("fork" not in multiprocessing.get_all_start_methods(), "needs 'fork' start method")
+class TestParallelPool(unittest.TestCase):
+
+    def tearDown(self):
+        ForwardSearcher.parallel_count = 0
+
+    def test_pool_forked_when_parallel_count_more_than_one(self):
+        searcher = ForwardSearcher.__new__(ForwardSearcher)
+        searcher.pool = None
+        ForwardSearcher.parallel_count = 2
+        searcher.open_pool()
+        pool = searcher.pool
+        self.assertIsNotNone(pool)
+        pids = set(pool.map(_getpid, range(8), chunksize=1))
+        self.assertTrue(0 < len(pids) <= 2)
+        self.assertNotIn(os.getpid(), pids)
+        searcher.close_pool()
+        self.assertIsNone(searcher.pool)
+
+    def test_no_pool_when_sequential(self):
+        searcher = ForwardSearcher.__new__(ForwardSearcher)
+        searcher.pool = None
+        ForwardSearcher.parallel_count = 1
+        searcher.open_pool()
+        self.assertIsNone(searcher.pool)
+
+
+if __name__ == "__main__":
+    unittest.main()